@@ -9,6 +9,8 @@ Base class for all animation types.
 from LEDAnimator.ExceptionErrors import *
 import time
 import LEDAnimator.Panel as Panel
+import LEDAnimator.Clock as Clock
+import LEDAnimator.BufferPool as BufferPool
 from LEDAnimator.NumpyImage import *
 from matplotlib.colors import *
 from LEDAnimator.Image import *
@@ -27,7 +29,9 @@ class AnimBase(object):
     """
 
     # default variables
-    startTime=time.time()   # reset by reset()
+    startTime=0.0           # reset by reset()
+    frameTime=None          # timestamp for the current frame, set by nextFrame(). See now()
+    clock=Clock.wallClock   # set by AnimInfo to the Animator's clock. See Clock.py
     curPalEntry=0
 
     background=None         # (r,g,b,a) tuple in Pixel order default None
@@ -58,6 +62,15 @@ class AnimBase(object):
     init=True               # used to indicate that an animation should initialise back to it's start point
 
     layerBuffer=None        # all animations are render to this first then merged with the Panel frameBuffer
+                            # taken from the BufferPool by reset() and given back when the animation ends
+    layerBox=None           # (x0,y0,x1,y1) of the layerBuffer drawn on by refreshCanvas(), None if nothing was
+    layerTarget=None        # set by AnimInfo, if not None drawLayer() collects the output instead of drawing it
+    layerDraws=None         # drawLayer() output this frame, (x,y,image,opacity,premultiplied,blendMode) tuples. None after reset()
+    lastDraws=None          # drawLayer() output last frame, sent again by redrawLayer()
+    opacity=1.0             # 0.0->1.0 applied to the whole layer when it is blended, used for fading
+    integerBlend=False      # True to build the layerBuffer with UtilLib.alphaBlendInt(), it then holds premultiplied colours
+    blendMode="over"        # how the layer is combined with the layers below, one of BLEND_MODES (see Constants.py)
+    panel=Panel             # where the layer is drawn, the Panel or a Zone (see Zone.py). Set by AnimInfo
 
     chain=None              # any animated chain
     startPause=0            # parameters which may be used to delay the start after a reset()
@@ -88,10 +101,11 @@ class AnimBase(object):
         for key, value in kwargs.iteritems():
             setattr(self, key, value)
 
-        self.setSpeed(self.speed)
+        if self.blendMode not in BLEND_MODES:
+            raise InvalidMode(self.animationClass()+" blendMode should be one of "+str(BLEND_MODES)+
+                              " got "+str(self.blendMode))
 
-        # ALL outputs for this layer are sent to this buffer before sending to Panel
-        self.layerBuffer=NumpyImage.NumpyImage(width=Panel.width, height=Panel.height, alpha=0)
+        self.setSpeed(self.speed)
 
 
 
@@ -102,6 +116,18 @@ class AnimBase(object):
         """
         return self.__class__.__name__
 
+    def now(self):
+        """
+        the time to use for all timing calculations in this frame.
+
+        The Animator passes the same frameTime to every layer so that they all agree on the time
+        (see Animator overrunPolicy). If the animation is driven without a frameTime the clock is read.
+
+        :return float: seconds
+        """
+        if self.frameTime is None: return self.clock.now()
+        return self.frameTime
+
     def _Debug(self,*args):
         """
         Simple debug message formatter
@@ -136,13 +162,13 @@ class AnimBase(object):
         # perform any image transform etc
         which.image.transform(which.transMatrix)
         self.scaleImage(which.image,which.scaleMode)
-        which.Xpos,which.Ypos=which.image.alignImage(which.alignMode,(Panel.width,Panel.height))
+        which.Xpos,which.Ypos=which.image.alignImage(which.alignMode,(self.panel.width,self.panel.height))
 
     def endPaused(self):
         """
         User animations can call this is they want to delay looping so viewers can see the end state
 
-        Calls refreshCanvas() to keep the display live
+        Calls redrawLayer() to keep the display live
 
         For this to work the animation code must call self.animationHasEnded() first.
 
@@ -164,9 +190,9 @@ class AnimBase(object):
             self._Debug("AnimBase.endPaused() finishedTime is not set")
             return False
 
-        if (time.time()-self.animationFinishedTime)<self.endPause:
+        if (self.now()-self.animationFinishedTime)<self.endPause:
             self._Debug("AnimBase.endPaused() is True")
-            self.refreshCanvas()
+            self.redrawLayer()
             return True
 
         self._Debug("AnimBase.endPaused() has ended.")
@@ -177,14 +203,14 @@ class AnimBase(object):
         user animations may call this to see if the animation start is paused
         to let the viewer see the initial state.
 
-        Calls refreshCanvas() to keep the display live
+        Calls redrawLayer() to keep the display live
 
         If True is returned the caller should exit their animation step() method
 
         :return bool: True or False
         """
-        if (time.time()-self.startTime)<self.startPause:
-            self.refreshCanvas()
+        if (self.now()-self.startTime)<self.startPause:
+            self.redrawLayer()
             self._Debug("AnimBase.startPaused() is True.")
             return True
 
@@ -206,7 +232,7 @@ class AnimBase(object):
         if self.animationFinished: return
 
         self.animationFinished=True
-        self.animationFinishedTime=time.time()
+        self.animationFinishedTime=self.now()
 
         if self.endPause is not None:
             self._Debug("AnimBase.animationHasFinished() endPause is active.")
@@ -230,6 +256,9 @@ class AnimBase(object):
         for key, value in kwargs.iteritems():
             setattr(self, key, value)
 
+        # ALL outputs for this layer are sent to this buffer before sending to Panel
+        self.acquireLayerBuffer()
+
         # do any images need loading?
         # it is delayed till the animation begins
         # otherwise it would further delay startup
@@ -237,33 +266,43 @@ class AnimBase(object):
         self.loadImage(self.fgImage)
 
         # reset the animation back to it's starting state
-        self.startTime = time.time()
+        self.startTime = self.now()
         self.tick = 0
         self.lastTick = 0
         self.animationFinished=False
         self.animationFinishedTime=None
+        self.opacity=1.0
+
+        # the last frame no longer shows the animation's state
+        self.lastDraws=None
+        self.layerDraws=None
 
-        if self.durationStart is None: self.durationStart=time.time()
+        if self.durationStart is None: self.durationStart=self.now()
 
         self.init=True  # tells the animation to initialise itself
 
         if self.startPos is not None and self.fgImage is not None:
             self.fgImage.setPosition(self.startPos)
 
-    def nextFrame(self,id="[No id]",debug=False):
+    def nextFrame(self,id="[No id]",debug=False,frameTime=None):
         """
         calculates the current value of self.tick based on the speed of the animation then calls the animation's step()
         function to move the animation on
         :param chain: only used by chain animations (default None)
+        :param float frameTime: timestamp for this frame, see now(). None means read the clock
         :return: True if the duration has expired otherwise false
         """
         self.id=id
         self.debug=debug
+        self.frameTime=frameTime
+
+        # keep last frame's output for redrawLayer()
+        self.lastDraws,self.layerDraws=self.layerDraws,[]
 
         self._Debug("AnimBase.nextFrame() called.")
 
         # update the current tick value
-        t=time.time()-self.startTime    # interval since start
+        t=self.now()-self.startTime     # interval since start
         ticks=t*self.fps                #
         # we report the ticks that have passed based on speed
         # at speed=2.0 this counts from 0,2,4,8...(fps/2)
@@ -279,8 +318,9 @@ class AnimBase(object):
             self.reset()
 
         # time is up, we move on to the next animation in the sequence
-        if (time.time()-self.durationStart)>=self.duration:
+        if (self.now()-self.durationStart)>=self.duration:
             self.durationStart=None
+            self.releaseLayerBuffer()
             self._Debug("AnimBase.nextFrame() duration has expired.")
             return True
 
@@ -293,6 +333,7 @@ class AnimBase(object):
                 self.reset()
             else:
                 print "AnimBase.nextFrame() animation finished & does not loop"
+                self.releaseLayerBuffer()
                 return True
 
         if self.startPaused():
@@ -354,7 +395,149 @@ class AnimBase(object):
         """
 
         x,y,data=self.chain.getAllPixels()
-        self.layerBuffer.setPixel(x, y, data)
+
+        if not self.integerBlend:
+            self.layerBuffer.setPixel(x, y, data)
+        elif len(x)>0:
+            # as setPixel() but the layerBuffer holds premultiplied colours
+            f=np.vectorize(nearest)
+            px,py=f(x),f(y)
+            out=self.layerBuffer.getImageData()
+            pixels=out[py,px]
+            out[py,px]=alphaBlendInt(data,pixels)
+
+        if len(x)==0: return
+
+        x0,y0=nearest(np.min(x)),nearest(np.min(y))
+        if x0<0 or y0<0:
+            # negative coordinates wrap round to the other side of the buffer
+            self.addToLayerBox(0,0,self.layerBuffer.width,self.layerBuffer.height)
+        else:
+            self.addToLayerBox(x0,y0,nearest(np.max(x))+1,nearest(np.max(y))+1)
+
+    def addToLayerBox(self,x0,y0,x1,y1):
+        """
+        records that part of the layerBuffer has been drawn on so refreshCanvas() only sends
+        that part to the Panel
+
+        :param int x0: left
+        :param int y0: top
+        :param int x1: right + 1
+        :param int y1: bottom + 1
+        :return None: layerBox is updated
+        """
+        x0,y0=max(x0,0),max(y0,0)
+        x1,y1=min(x1,self.layerBuffer.width),min(y1,self.layerBuffer.height)
+        if x1<=x0 or y1<=y0: return
+
+        if self.layerBox is not None:
+            bx0,by0,bx1,by1=self.layerBox
+            x0,y0,x1,y1=min(x0,bx0),min(y0,by0),max(x1,bx1),max(y1,by1)
+
+        self.layerBox=(x0,y0,x1,y1)
+
+    def pasteOnLayerBuffer(self,image):
+        """
+        pastes an Image at its position on the layerBuffer
+
+        :param Image image: bgImage or fgImage
+        :return None: layerBuffer is updated
+        """
+        X,Y=image.getPosition()
+        data=image.getImageData()
+        pasteWithAlphaAt(self.layerBuffer.getImageData(),X, Y, data, integer=self.integerBlend,
+                         alphaClass=image.getAlphaClass())
+
+        h,w=data.shape[:2]
+        X,Y=nearest(X),nearest(Y)
+        self.addToLayerBox(X,Y,X+w,Y+h)
+
+    def acquireLayerBuffer(self):
+        """
+        takes a layer buffer, the size of the panel or zone, from the BufferPool if the animation does not
+        already have one
+
+        :return: Nothing
+        """
+        if self.layerBuffer is not None:
+            if (self.layerBuffer.width,self.layerBuffer.height)==(self.panel.width,self.panel.height): return
+
+            # the animation has been moved to a different sized zone
+            self.releaseLayerBuffer()
+
+        self.layerBuffer=BufferPool.acquire(self.panel.width,self.panel.height)
+
+    def releaseLayerBuffer(self):
+        """
+        gives the layer buffer back to the BufferPool, called when the animation ends
+
+        :return: Nothing
+        """
+        if self.layerBuffer is None: return
+
+        BufferPool.release(self.layerBuffer)
+        self.layerBuffer=None
+        self.lastDraws=None
+        self.layerDraws=None
+
+    def drawLayer(self,x,y,image,opacity=1.0,premultiplied=False):
+        """
+        sends this layer's output to the Panel.
+
+        When layers are stepped in parallel (see Animator layerMode) the output is collected
+        in layerTarget and the Animator draws it on the Panel, in layer order, once every layer
+        has been stepped. The image must not be changed until then.
+
+        The image is blended with its alpha multiplied by opacity and the layer opacity, the
+        image itself is not changed. The layer blendMode decides how it is combined with the
+        layers below.
+
+        :param float x: top left coord of image
+        :param float y: top left coord of image
+        :param image: numpy image (ndarray) to draw
+        :param float opacity: 0.0->1.0 for this image only
+        :param bool premultiplied: True if the image colours are premultiplied by alpha, see UtilLib.alphaBlendInt()
+        :return None:
+        """
+        self.sendDraw((x,y,image,opacity*self.opacity,premultiplied,self.blendMode))
+
+    def sendDraw(self,draw):
+        """
+        used by drawLayer() and redrawLayer()
+
+        :param tuple draw: (x,y,image,opacity,premultiplied,blendMode)
+        :return None:
+        """
+        if self.layerDraws is not None: self.layerDraws.append(draw)
+
+        if self.layerTarget is not None:
+            self.layerTarget.append(draw)
+        else:
+            self.panel.DrawImage(*draw)
+
+    def redrawLayer(self):
+        """
+        sends the layer output from the last frame again, used when the animation has not moved on
+        (see isNotNextStep()) so nothing needs rendering. refreshCanvas() is used if there is
+        no last frame, for instance just after reset().
+
+        :return None:
+        """
+        if self.lastDraws is None:
+            self.refreshCanvas()
+            return
+
+        for draw in self.lastDraws:
+            self.sendDraw(draw)
+
+    def getQualityKnobs(self):
+        """
+        Override to offer settings the QualityGovernor can turn down when the Animator
+        cannot keep up. See QualityGovernor.py
+
+        :return list: QualityKnob instances
+        """
+        return []
 
     def isNotNextStep(self):
         """
@@ -417,9 +600,9 @@ class AnimBase(object):
         mode=scaleMode[:1].upper()
 
         if mode=="V" or mode=="H":
-            img.resizeKeepAspect(Panel.width,Panel.height)
+            img.resizeKeepAspect(self.panel.width,self.panel.height)
         elif mode=="F":
-            img.resizeFitToTarget(Panel.width,Panel.height)
+            img.resizeFitToTarget(self.panel.width,self.panel.height)
         else:
             raise InvalidMode("AnimBase.setScale(). Image scale mode should be V(ertical),H(orizontal) or F(it)")
 
@@ -441,27 +624,33 @@ class AnimBase(object):
         # so that lower layers show through
         self._Debug("AnimBase.refreshCanvas() begins")
         self.layerBuffer.clear()
+        self.layerBox=None
 
         # has itr got a simple background color?
         if self.background is not None:
             self._Debug("AnimBase.refreshCanvas() background fill.")
-            self.layerBuffer.fill(self.background)
+            if self.integerBlend:
+                self.layerBuffer.fill(tuple(premultiply(np.array([self.background],np.uint8))[0]))
+            else:
+                self.layerBuffer.fill(self.background)
+            self.addToLayerBox(0,0,self.layerBuffer.width,self.layerBuffer.height)
 
         # or has it got a background image?
         if self.bgImage is not None and self.bgImage.image is not None:
             self._Debug( "AnimBase.refreshCanvas() doing bgImage")
-            X,Y=self.bgImage.getPosition()
-            pasteWithAlphaAt(self.layerBuffer.getImageData(),X, Y, self.bgImage.getImageData())
+            self.pasteOnLayerBuffer(self.bgImage)
 
         if self.fgImage is not None and self.fgImage.image is not None:
             self._Debug( "AnimBase.refreshCanvas() doing fgImage.")
-            X,Y=self.fgImage.getPosition()
-            pasteWithAlphaAt(self.layerBuffer.getImageData(),X, Y, self.fgImage.getImageData())
+            self.pasteOnLayerBuffer(self.fgImage)
 
         if self.chain is not None:
             self._Debug("AnimBase.refreshCanvas() doing chain.")
             self.drawChainOnLayerBuffer()
 
-        Panel.DrawImage(0,0,self.layerBuffer.getImageData())
+        # the rest of the layerBuffer is transparent so only the part drawn on is blended
+        if self.layerBox is not None:
+            x0,y0,x1,y1=self.layerBox
+            self.drawLayer(x0,y0,self.layerBuffer.getImageData()[y0:y1,x0:x1],premultiplied=self.integerBlend)
 
         self._Debug("AnimBase.refreshCanvas() finished.")
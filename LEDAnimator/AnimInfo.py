@@ -5,7 +5,13 @@ Class to hold generic information about an animation
 
 Used by Animator.
 
+A layer can be updated less often than the Animator frame rate by setting updateFps. On frames
+where the layer is not due its last output is drawn again instead of stepping the animation.
+
 """
+import Panel
+from QualityGovernor import QualityKnob
+import Clock
 
 
 class AnimInfo(object):
@@ -16,6 +22,13 @@ class AnimInfo(object):
     animFunc = None
     curPalEntry = 0
     palette = None
+    clock = Clock.wallClock  # the Animator's clock, passed on to the animations
+    panel = Panel  # where the layer is drawn, the Panel or a Zone. Passed on to the animations
+
+    # per layer update rate
+    updateFps = None    # None means step the animation every frame
+    nextUpdate = None   # time the layer is next due to be stepped
+    lastDraws = None    # output from the last step, (x,y,image,opacity,premultiplied,blendMode) tuples
 
     # debugging
     debug = False
@@ -36,18 +49,143 @@ class AnimInfo(object):
 
         :return:
         """
+        self.nextUpdate=None
+        self.lastDraws=None
+
         if self.animFunc is not None:
+            # the last frame time belongs to the previous run
+            self.animFunc.frameTime=None
             self.animFunc.reset()
 
-    def nextFrame(self,debug=False):
+    def jumpTo(self,entry):
+        """
+        moves the layer to an entry in its AnimSequence, the entry starts from the beginning on the next frame
+
+        :param int entry: index into the AnimSequence, 0 is the first
+        :return: Nothing
+        """
+        assert 0<=entry<self.animSeq.listLen,"AnimInfo.jumpTo() entry should be 0 to "+str(self.animSeq.listLen-1)+\
+                                             " got "+str(entry)
+
+        # so the animation which was playing starts afresh if it plays again
+        if self.animFunc is not None:
+            self.animFunc.durationStart=None
+            self.animFunc.releaseLayerBuffer()
+
+        self.animSeq.curAnim=entry
+        self.animSeq.animList[entry].durationStart=None
+        self.animFunc=None
+        self.nextUpdate=None
+        self.lastDraws=None
+
+    def setSequence(self,seq):
+        """
+        replaces the layer's AnimSequence, the new sequence starts from its first entry on the next frame
+
+        :param AnimSequence seq: the new sequence
+        :return: Nothing
+        """
+        if self.animFunc is not None:
+            self.animFunc.durationStart=None
+            self.animFunc.releaseLayerBuffer()
+
+        self.animFunc=None
+        self.animSeq=seq
+        self.jumpTo(0)
+
+    def nextFrame(self,debug=False,frameTime=None,layerTarget=None):
         """
         called from Animator.run()
         iterates through the animation calling the reset() and step() functions
+
+        :param bool debug: enables debug messages
+        :param float frameTime: timestamp for this frame, shared by all layers. None means read the clock
+        :param list layerTarget: if not None the layer output is appended to it instead of being drawn on the Panel
         :return: Nothing
         """
 
         self.debug=debug
 
+        if self.updateFps is None:
+            self.stepAnimation(frameTime,layerTarget)
+            return
+
+        now=frameTime if frameTime is not None else self.clock.now()
+
+        if self.lastDraws is None or now>=self.nextUpdate:
+            self.lastDraws=[]
+            if self.stepAnimation(frameTime,self.lastDraws):
+                # the next animation in the sequence has not drawn anything yet so step again next frame
+                self.lastDraws=None
+            else:
+                self.scheduleUpdate(now)
+
+        if self.lastDraws is None: return
+
+        # draw the layer output, either just rendered or from the last update
+        for draw in self.lastDraws:
+            if layerTarget is not None:
+                layerTarget.append(draw)
+            else:
+                self.panel.DrawImage(*draw)
+
+    def getRateKnob(self,name,fps):
+        """
+        creates a QualityKnob which lowers the update rate of this layer
+
+        :param str name: unique name for the knob
+        :param float fps: Animator frame rate
+        :return QualityKnob: levels are the current updateFps then fps/2 and fps/4 where they are slower.
+                             None if the layer already updates at fps/4 or less
+        """
+        def setUpdateFps(updateFps):
+            self.updateFps=updateFps
+
+        current=self.updateFps if self.updateFps is not None else fps
+
+        # lowering quality must never speed a layer up
+        levels=[self.updateFps]
+        for updateFps in (min(current,fps/2.0),min(current,fps/4.0)):
+            if updateFps<(levels[-1] if levels[-1] is not None else fps):
+                levels.append(updateFps)
+
+        if len(levels)<2: return None
+
+        return QualityKnob(name=name,levels=levels,apply=setUpdateFps,priority=3)
+
+    def getQualityKnobs(self):
+        """
+        :return list: QualityKnob instances offered by every animation in the layer's AnimSequence
+        """
+        knobs=[]
+        for anim in self.animSeq.animList:
+            knobs.extend(anim.getQualityKnobs())
+        return knobs
+
+    def scheduleUpdate(self,now):
+        """
+        works out when the layer is next due to be stepped
+
+        :param float now: time of the current frame
+        :return: Nothing
+        """
+        interval=1.0/self.updateFps
+
+        if self.nextUpdate is None or now>=self.nextUpdate+interval:
+            # first update or we have fallen behind
+            self.nextUpdate=now+interval
+        else:
+            self.nextUpdate+=interval
+
+    def stepAnimation(self,frameTime,layerTarget):
+        """
+        steps the current animation, moving on to the next one in the sequence when its duration expires
+
+        :param float frameTime: timestamp for this frame
+        :param list layerTarget: if not None the layer output is appended to it instead of being drawn on the Panel
+        :return bool: True if the animation duration expired
+        """
+
         # initialise the next animation - setup animFunc
 
         if self.animFunc is None:
@@ -56,7 +194,12 @@ class AnimInfo(object):
         # chain is ignored by non-chain based animations
         self.animFunc.chain=self.chain
         self.animFunc.id=self.id
+        self.animFunc.clock=self.clock
+        self.animFunc.panel=self.panel
+        self.animFunc.layerTarget=layerTarget
 
-        if self.animFunc.nextFrame(debug=self.debug,id=self.animFunc.id):
+        if self.animFunc.nextFrame(debug=self.debug,id=self.animFunc.id,frameTime=frameTime):
             self.animFunc = self.animSeq.getNextAnimation()
+            return True
 
+        return False
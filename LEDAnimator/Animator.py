@@ -7,10 +7,30 @@ the fps of the animation.
 
 If the Panel exits this code will halt
 
+Changes made while the show is running (queueCommand()) are applied at the start of the next frame.
+See ControlServer.py which uses them to control a running show through a Unix domain socket.
+
+start() runs the show on a background thread which stop() ends, waiting up to stopTimeout
+seconds for it to finish. pause() holds the show on the current frame, the thread blocks until
+resume() is called so a paused or stopped Animator uses no CPU. After a pause the show carries on
+from where it stopped.
+
 """
 import time
+import zlib
+import Queue
+import numpy as np
+from multiprocessing.pool import ThreadPool
 from AnimInfo import AnimInfo
+from FrameScheduler import FrameScheduler
+from LayerProcess import LayerProcess,canFork
+from QualityGovernor import QualityGovernor
+from DirtyRects import DirtyRects
+from Clock import WallClock
+from ControlServer import ControlServer
+from UtilLib import monotonic
 import Panel
+import Scratch
 import threading
 
 class Animator(object):
@@ -18,6 +38,55 @@ class Animator(object):
     chain=None      # updated by addAnimation
     seq=None        # animation sequence
     fps=None        # passed in
+    clock=None      # timing source for all the animations, WallClock() if not given. See Clock.py
+    panel=Panel     # where the show is drawn, the Panel or a Zone. See Zone.py
+
+    # runtime control - see ControlServer.py
+    controlSocket=None      # path of the Unix domain socket, None for no control server
+    sequences=None          # dict of named AnimSequences which can be swapped in by the control server
+    controlServer=None      # created by run()
+
+    # if set run() hands the Animator to renderer(animator) instead of running the show
+    # used by OfflineRender.py to render show scripts without changing them
+    renderer=None
+
+    # frame pacing - see FrameScheduler.py
+    scheduler="busywait"    # or "deadline" to sleep between frames instead of spinning
+    spinTail=0.002          # deadline mode: seconds before the deadline when sleeping gives way to spinning
+    overrunPolicy="drop"    # what happens to show time when frames overrun: "drop", "slow" or "fixed"
+    jitterReportInterval=5  # seconds between scheduling jitter reports when debugging
+    frameScheduler=None     # created by run()
+    frameInterval=None      # seconds per frame, set by run()
+    showEpoch=None          # clock time at show time zero, set by run()
+
+    # True to ship frames to the matrix on Panel's output thread whilst the next frame is drawn
+    pipelined=False
+
+    # how the layers are stepped each frame
+    # "serial" one after another, each drawing straight onto the Panel
+    # "threads" in parallel on a thread pool then drawn onto the Panel in layer order
+    # "processes" in parallel, each layer in its own worker process (see LayerProcess.py)
+    layerMode="serial"
+    layerThreads=None       # thread pool size, None means one thread per layer
+    layerPool=None          # created by run()
+    layerProcesses=None     # created by run()
+
+    # if True frames identical to the previous one are not sent to the Panel and the
+    # Animator sleeps instead of spinning until the next frame is due
+    skipStaticFrames=False
+    staticFrames=0          # frames skipped by the current (or last) run
+    lastFrameSignature=None
+
+    # if True only the rectangles of the Panel which changed since the last frame are redrawn
+    # and sent to the matrix. See DirtyRects.py
+    dirtyRects=False
+    compositor=None         # created by run()
+    changedRects=None       # rectangles changed by the last frame, None for the whole Panel
+
+    # if True quality is lowered when frames overrun and raised again when there is time to spare
+    # see QualityGovernor.py
+    adaptiveQuality=False
+    governor=None           # created by run()
 
     #debugging
     debug=False
@@ -25,6 +94,7 @@ class Animator(object):
     warned=False
     running=False
     runThread=None
+    stopTimeout=5.0         # seconds stop() waits for the run thread to finish
 
     def __init__(self, **kwargs):
 
@@ -35,25 +105,36 @@ class Animator(object):
         self.running=False
         self.runThread=None
 
+        # set whilst playing, cleared by pause(). The run loop waits on it at the start of each frame
+        self.playing=threading.Event()
+        self.playing.set()
+
+        # changes waiting for the next frame, see queueCommand()
+        self.commands=Queue.Queue()
+
+        if self.clock is None: self.clock=WallClock()
+
     def addAnimation(self, **kwargs):
 
         self.chain=None # text animations don't specify a chain
         self.seq=None
+        self.updateFps=None # layer updates per second, None means every frame
 
         for key,value in kwargs.iteritems():
             setattr(self,key,value)
 
-        self.animations.append(AnimInfo(chain=self.chain,animSeq=self.seq,fps=self.fps,id=self.id))
+        self.animations.append(AnimInfo(chain=self.chain,animSeq=self.seq,fps=self.fps,id=self.id,
+                                        updateFps=self.updateFps,clock=self.clock,panel=self.panel))
 
     def checkPanelIsRunning(self):
         # simulator window may have been closed
-        if Panel.isRunning(): return
+        if self.panel.isRunning(): return
 
         # possibly the Panel is taking time to initialise
         # terminate if timeout reached
 
         t0 = time.time()
-        while not Panel.isRunning():
+        while not self.panel.isRunning():
             if (time.time() - t0) >= 5:
                 if self.debug: print "Animator: panel is not running (5s timeout whilst waiting)."
                 exit(0)
@@ -70,30 +151,142 @@ class Animator(object):
         :return: Nothing
         """
 
+        runThread=self.runThread
+        if runThread is not None and runThread.is_alive():
+            print("Animator background thread is running. Ignored.")
+            return
+
         if reset: self.reset()
 
-        if self.runThread is not None:
-            print("Animator background thread is running. Ignored.")
+        self.playing.set()
         self.runThread=threading.Thread(target=self.run)
         self.runThread.start()
 
-    def stop(self):
+    def stop(self,timeout=None):
         """
-        stops the run() method
+        stops the run() method and waits for the background thread, if any, to finish
 
-        :return:
+        :param float timeout: seconds to wait, None means stopTimeout
+        :return bool: True if stopped, False if the thread did not finish in time
         """
         self.running=False
-        #wait for the run() method to exit
-        while self.runThread is not None:
-            pass
-        Panel.Clear()
-        Panel.UpdateDisplay()
+
+        # a paused run loop must wake up to see it has been stopped
+        self.playing.set()
+
+        runThread=self.runThread
+        if runThread is not None and runThread is not threading.current_thread():
+            runThread.join(self.stopTimeout if timeout is None else timeout)
+            if runThread.is_alive():
+                print "Animator.stop() background thread did not stop within the timeout."
+                return False
+
+        self.panel.Clear()
+        self.panel.UpdateDisplay()
+        return True
+
+    def pause(self):
+        """
+        holds the show on the current frame. The run loop sleeps until resume() or stop() is called.
+
+        :return: Nothing
+        """
+        self.playing.clear()
+
+    def resume(self):
+        """
+        carries on with the show from where pause() stopped it
+
+        :return: Nothing
+        """
+        self.playing.set()
+
+    def isPaused(self):
+        return not self.playing.is_set()
+
+    def queueCommand(self,command,*args):
+        """
+        asks the run loop to call command(*args) at the start of the next frame. Safe to call from any thread.
+
+        :param command: function to call
+        :param args: its parameters
+        :return: Nothing
+        """
+        self.commands.put((command,args))
+
+    def applyCommands(self):
+        """
+        calls the queued commands, in the order they were queued - called by runFrame()
+
+        :return: Nothing
+        """
+        while True:
+            try:
+                command,args=self.commands.get_nowait()
+            except Queue.Empty:
+                return
+            command(*args)
+
+    def getLayer(self,layer):
+        """
+        :param layer: layer number (0 is the bottom layer) or the id given to addAnimation()
+        :return AnimInfo: the layer
+        """
+        if isinstance(layer,int):
+            assert 0<=layer<len(self.animations),"Animator.getLayer() layer should be 0 to "+\
+                                                  str(len(self.animations)-1)+" got "+str(layer)
+            return self.animations[layer]
+
+        for animInfo in self.animations:
+            if animInfo.id==layer: return animInfo
+
+        raise AssertionError("Animator.getLayer() no layer with id "+str(layer))
+
+    def setFps(self,fps):
+        """
+        changes the frame rate of a running show from the next frame on
+
+        :param fps: frames per second
+        :return: Nothing
+        """
+        assert fps>0,"Animator.setFps() fps should be greater than zero got "+str(fps)
+
+        self.fps=fps
+        if self.frameScheduler is not None:
+            self.frameScheduler.setFps(fps)
+            self.frameInterval=self.frameScheduler.interval
+        if self.governor is not None:
+            self.governor.interval=self.frameInterval
+
+    def setClock(self,clock):
+        """
+        changes the clock used by the Animator and all its layers. See Clock.py
+
+        :param clock: WallClock, VirtualClock or SteppedClock
+        :return: Nothing
+        """
+        self.clock=clock
+        for animInfo in self.animations:
+            animInfo.clock=clock
 
     def reset(self):
         for animInfo in self.animations:
             animInfo.reset()
 
+        # worker processes have their own copy of the layers
+        if self.layerProcesses is not None:
+            for layerProcess in self.layerProcesses:
+                layerProcess.reset()
+
+    def getJitterStats(self):
+        """
+        scheduling accuracy of the current (or last) run. See FrameScheduler.JitterStats
+
+        :return dict: frame timing stats or None if run() has not been called
+        """
+        if self.frameScheduler is None: return None
+        return self.frameScheduler.getJitterStats()
+
 
     def run(self):
         """
@@ -102,71 +295,400 @@ class Animator(object):
         """
         assert self.fps is not None,"Animator.run() - fps not set."
 
-        # if fps is integer 1/fps would be integer zero!
-        frameInterval=1.0/self.fps
+        if Animator.renderer is not None:
+            try:
+                Animator.renderer(self)
+            finally:
+                self.runThread=None
+            return
+
+        try:
+            t0=self.startRun()
+            try:
+                self.runLoop(t0)
+            finally:
+                self.endRun()
+        finally:
+            self.runThread=None
+
+    def startRun(self):
+        """
+        gets everything ready for the first frame - called by run() and by AsyncDriver
 
-        if self.debug: print "Animator.run() Frame interval=",frameInterval
+        :return float: start time of the first frame (monotonic seconds)
+        """
+        assert self.layerMode in ("serial","threads","processes"),"Animator.run() - layerMode should be 'serial', " \
+                                                                   "'threads' or 'processes' got "+str(self.layerMode)
 
-        avg_frametime=0
+        self.frameScheduler=FrameScheduler(fps=self.fps,mode=self.scheduler,spinTail=self.spinTail,
+                                           overrunPolicy=self.overrunPolicy)
+
+        # if fps is integer 1/fps would be integer zero!
+        self.frameInterval=self.frameScheduler.interval
+
+        if self.debug: print "Animator.run() Frame interval=",self.frameInterval,"scheduler=",self.scheduler
 
-        warned=False
         self.running=True;
 
-        while self.running:
+        # show time is kept in the same epoch as the clock so that anything
+        # reset before the first frame lines up with the frame timestamps
+        self.showEpoch=self.clock.now()
+
+        if self.pipelined: Panel.StartPipeline()
+
+        # quality knobs for each layer, workers are given theirs when they are forked
+        layerKnobs=[[] for _ in self.animations]
+
+        if self.adaptiveQuality:
+            self.governor=QualityGovernor(interval=self.frameInterval)
+            for n,animInfo in enumerate(self.animations):
+                rateKnob=animInfo.getRateKnob("layer %d update rate" % n,self.fps)
+                if rateKnob is not None: layerKnobs[n].append(rateKnob)
+                self.governor.registerKnobs(layerKnobs[n])
+
+        layerMode=self.layerMode
+        if layerMode=="processes" and not canFork():
+            print "Animator.run() layerMode 'processes' needs os.fork(), using 'threads' instead."
+            layerMode="threads"
+
+        if layerMode=="threads":
+            self.layerPool=ThreadPool(self.layerThreads or max(1,len(self.animations)))
+        elif layerMode=="processes":
+            self.layerProcesses=[]
+            for n,animInfo in enumerate(self.animations):
+                if self.adaptiveQuality:
+                    # the parent cannot see which entry a worker is playing so offer them all
+                    layerKnobs[n].extend(animInfo.getQualityKnobs())
+                    self.governor.registerKnobs(layerKnobs[n])
+
+                layerProcess=LayerProcess(animInfo=animInfo,width=self.panel.width,height=self.panel.height,
+                                          debug=self.debug,knobs=layerKnobs[n])
+                layerProcess.start()
+                self.layerProcesses.append(layerProcess)
+
+        self.staticFrames=0
+        self.lastFrameSignature=None
+        self.avgFrameTime=0
+        self.changedRects=None
+
+        if self.dirtyRects:
+            self.compositor=DirtyRects()
+
+        if self.controlSocket is not None:
+            self.controlServer=ControlServer(animator=self,path=self.controlSocket)
+            self.controlServer.start()
+
+        t0=self.frameScheduler.start()  # start time for the first frame
+        self.lastReport=t0
+        return t0
+
+    def endRun(self):
+        """
+        tidies up after the last frame - called by run() and by AsyncDriver
+
+        :return: Nothing
+        """
+        self.running=False
+        if self.controlServer is not None:
+            self.controlServer.stop()
+            self.controlServer=None
+        if self.layerPool is not None:
+            self.layerPool.close()
+            self.layerPool.join()
+            self.layerPool=None
+        if self.layerProcesses is not None:
+            for layerProcess in self.layerProcesses:
+                layerProcess.stop()
+            self.layerProcesses=None
+        if self.governor is not None:
+            self.governor.restore()
+        # other Animators, e.g. one per Zone, may still be using a pipeline started for the whole Panel
+        if self.pipelined: Panel.StopPipeline()
+
+    def stepLayer(self,animInfo,frameTime,frameInterval,layerTarget=None):
+        """
+        moves one layer on to the next frame
+
+        :param AnimInfo animInfo: the layer
+        :param float frameTime: timestamp for this frame
+        :param float frameInterval: seconds per frame, used for debug warnings
+        :param list layerTarget: collects the layer output, None draws it on the Panel
+        :return: Nothing
+        """
+        if animInfo is None:
+            print "Animator.run() No animation info."
+            exit(1)
+
+        if self.debug:
+            t2=time.time()
+            animInfo.nextFrame(self.debug,frameTime,layerTarget)
+            t3=time.time()
+            if (t3-t2)>frameInterval:
+                print "Animator.run() anim.nextFrame() took","%.6f" % (t3-t2,) ,"for ",\
+                    animInfo.animFunc.__class__.__name__,"frameInterval is",frameInterval
+        else:
+            animInfo.nextFrame(self.debug,frameTime,layerTarget)
+
+    def stepLayersSerial(self,frameTime,frameInterval):
+        """
+        steps the layers one after another collecting their output
+
+        :param float frameTime: timestamp for this frame
+        :param float frameInterval: seconds per frame, used for debug warnings
+        :return list: output of each layer, bottom layer first. See drawLayers()
+        """
+        layerTargets=[[] for _ in self.animations]
+
+        for n,animInfo in enumerate(self.animations):
+            self.stepLayer(animInfo,frameTime,frameInterval,layerTargets[n])
+
+        return layerTargets
+
+    def stepLayersThreaded(self,frameTime,frameInterval):
+        """
+        steps all the layers in parallel collecting their output
+
+        :param float frameTime: timestamp for this frame
+        :param float frameInterval: seconds per frame, used for debug warnings
+        :return list: output of each layer, bottom layer first. See drawLayers()
+        """
+        layerTargets=[[] for _ in self.animations]
+
+        self.layerPool.map(lambda n: self.stepLayer(self.animations[n],frameTime,frameInterval,layerTargets[n]),
+                           range(len(self.animations)))
+
+        return layerTargets
+
+    def stepLayersInProcesses(self,frameNumber,frameTime):
+        """
+        asks every layer process for the next frame and waits for them all
+
+        :param int frameNumber: frame count since run() started
+        :param float frameTime: timestamp for this frame
+        :return list: output of each layer, bottom layer first. See drawLayers()
+        """
+        # the workers have their own copies of the quality settings
+        knobValues=self.governor.getValues() if self.governor is not None else None
+
+        for layerProcess in self.layerProcesses:
+            layerProcess.requestFrame(frameNumber,frameTime,knobValues)
+
+        return [[(0,0,layerProcess.getFrame(frameNumber),1.0,layerProcess.isPremultiplied(),layerProcess.getBlendMode())]
+                for layerProcess in self.layerProcesses]
+
+    def drawLayers(self,layerTargets):
+        """
+        draws the collected layer output on the Panel bottom layer first
+
+        :param list layerTargets: a list of (x,y,image,opacity,premultiplied,blendMode) tuples for each layer
+        :return: Nothing
+        """
+        for layerTarget in layerTargets:
+            for draw in layerTarget:
+                self.panel.DrawImage(*draw)
+
+    def frameHasChanged(self,layerTargets):
+        """
+        compares a checksum of the collected layer output with the previous frame
 
-            # simulator window may have been closed
-            # this exits if so
-            self.checkPanelIsRunning()
+        :param list layerTargets: a list of (x,y,image,opacity,premultiplied,blendMode) tuples for each layer
+        :return bool: True if the frame will look different to the last one
+        """
+        signature=[self.panel.panelBgColor]
+        for layerTarget in layerTargets:
+            for x,y,image,opacity,premultiplied,blendMode in layerTarget:
+                signature.append((x,y,opacity,premultiplied,blendMode,image.shape,
+                                  zlib.adler32(np.ascontiguousarray(image))))
 
-            t0 = time.time()    # start time for this frame
+        if signature==self.lastFrameSignature:
+            return False
 
-            Panel.Clear()
+        self.lastFrameSignature=signature
+        return True
 
-            # run through all the animations.
-            # the animation list contains info about each animation
-            # We call nextFrame() for each one on each pass
+    def drawChanges(self,layerTargets):
+        """
+        redraws only the parts of the Panel which have changed since the last frame
+
+        :param list layerTargets: a list of (x,y,image,opacity,premultiplied,blendMode) tuples for each layer
+        :return bool: False if skipStaticFrames is set and nothing has changed
+        """
+        self.changedRects=self.compositor.findChanges(self.panel,layerTargets)
+
+        # with pipelined output the frameBuffer may hold an older frame than the last one
+        redrawRects=self.compositor.findRedraw(self.panel,self.changedRects)
+
+        if redrawRects is None:
+            self.panel.Clear()
+            self.drawLayers(layerTargets)
+        else:
+            self.compositor.redraw(self.panel,layerTargets,redrawRects)
+
+        return not self.skipStaticFrames or self.changedRects<>[]
+
+    def governCurrentLayers(self,loopTime):
+        """
+        registers the quality knobs of the current animations then lets the governor decide
+        if quality needs to change
+
+        :param float loopTime: time taken by this frame
+        :return: Nothing
+        """
+        # layer processes had all their knobs registered by startRun()
+        if self.layerProcesses is None:
             for animInfo in self.animations:
-                if animInfo is None:
-                    print "Animator.run() No animation info."
-                    exit(1)
-
-                if self.debug:
-                    t2=time.time()
-                    animInfo.nextFrame(self.debug)
-                    t3=time.time()
-                    if (t3-t2)>frameInterval:
-                        print "Animator.run() anim.nextFrame() took","%.6f" % (t3-t2,) ,"for ",\
-                            animInfo.animFunc.__class__.__name__,"frameInterval is",frameInterval
-                else:
-                    animInfo.nextFrame(self.debug)
-
-            # copy panel frame buffer to actual or simulator matrix
-
-            Panel.UpdateDisplay()
-
-            # work out if we need to wait before the next loop
-            loopTime=time.time() - t0
-
-            # check if
-            if (loopTime>frameInterval) and not self.warned:
-                print "Animator.run() Animation frame interval exceeded - check animation durations. " \
-                                     "Total loopTime=",loopTime,"frameInterval=",frameInterval
-                self.warned=True
-
-            # slow down animation cycle to match the required frameInterval
-            # this gives a repeatable time interval for the animations
-            # 200fps may not be achievable.
-
-            if self.debug:
-                if avg_frametime==0:
-                    avg_frametime=loopTime
-                else:
-                    avg_frametime=(avg_frametime+loopTime)/2
-
-                print "Animator.run() Frame animations took average of %.6f seconds" % (avg_frametime)
-
-            # wait till the next frame interval
-            while loopTime < frameInterval:
-                loopTime = time.time() - t0
-
-        self.runThread=None
\ No newline at end of file
+                if animInfo.animFunc is not None:
+                    self.governor.registerKnobs(animInfo.animFunc.getQualityKnobs())
+
+        self.governor.update(loopTime,self.frameScheduler.getShowTime())
+
+    def renderFrame(self,frameTime,frameInterval,frameNumber=0):
+        """
+        steps every layer and draws the frame on the Panel frameBuffer. Does not update the display.
+
+        :param float frameTime: timestamp for this frame
+        :param float frameInterval: seconds per frame, used for debug warnings
+        :param int frameNumber: frame count since the show started, used by layer processes
+        :return bool: False if skipStaticFrames is set and the frame is the same as the last one
+        """
+        # scratch arrays not used last frame can go
+        Scratch.reset()
+
+        # run through all the animations.
+        # the animation list contains info about each animation
+        # We call nextFrame() for each one on each pass
+        if self.layerProcesses is not None:
+            layerTargets=self.stepLayersInProcesses(frameNumber,frameTime)
+        elif self.layerPool is not None:
+            layerTargets=self.stepLayersThreaded(frameTime,frameInterval)
+        elif self.skipStaticFrames or self.compositor is not None:
+            layerTargets=self.stepLayersSerial(frameTime,frameInterval)
+        else:
+            # layers draw straight onto the Panel
+            self.panel.Clear()
+            for animInfo in self.animations:
+                self.stepLayer(animInfo,frameTime,frameInterval)
+            return True
+
+        if self.compositor is not None:
+            return self.drawChanges(layerTargets)
+
+        frameChanged=True
+        if self.skipStaticFrames: frameChanged=self.frameHasChanged(layerTargets)
+
+        if frameChanged:
+            self.panel.Clear()
+            self.drawLayers(layerTargets)
+
+        return frameChanged
+
+    def runLoop(self,t0):
+        """
+        renders frames until stopped - called by run()
+
+        :param float t0: start time of the first frame (monotonic seconds)
+        :return: Nothing
+        """
+        while self.running:
+
+            if not self.playing.is_set():
+                self.waitWhilePaused()
+                if not self.running: break
+
+            frameChanged=self.runFrame()
+
+            if self.clock.isRealTime:
+                # nothing has changed so there is no need to spin waiting for the next frame
+                t0=self.frameScheduler.waitForNextFrame(idle=not frameChanged)
+            else:
+                # virtual time - start the next frame straight away
+                t0=self.frameScheduler.startNextFrame()
+
+            self.debugReport(t0)
+
+    def runFrame(self):
+        """
+        renders the current frame and sends it to the Panel - called by runLoop() and by AsyncDriver
+
+        :return bool: True if the frame was sent to the Panel, False if it was the same as the last one
+        """
+        # changes from other threads are only made between frames
+        if not self.commands.empty(): self.applyCommands()
+
+        frameInterval=self.frameInterval
+
+        # simulator window may have been closed
+        # this exits if so
+        self.checkPanelIsRunning()
+
+        # every layer sees the same timestamp for this frame
+        if self.clock.isRealTime:
+            frameTime=self.showEpoch+self.frameScheduler.getShowTime()
+        else:
+            frameTime=self.clock.now()
+
+        frameChanged=self.renderFrame(frameTime,frameInterval,self.frameScheduler.frameCount)
+
+        # copy panel frame buffer to actual or simulator matrix
+        if frameChanged:
+            self.panel.UpdateDisplay(self.changedRects)
+        else:
+            self.staticFrames+=1
+
+        # work out if we need to wait before the next loop
+        loopTime=self.frameScheduler.getLoopTime()
+
+        if self.governor is not None:
+            self.governCurrentLayers(loopTime)
+
+        # check if
+        if (loopTime>frameInterval) and not self.warned:
+            print "Animator.run() Animation frame interval exceeded - check animation durations. " \
+                                 "Total loopTime=",loopTime,"frameInterval=",frameInterval, \
+                                 "overrunPolicy=",self.overrunPolicy
+            self.warned=True
+
+        # slow down animation cycle to match the required frameInterval
+        # this gives a repeatable time interval for the animations
+        # 200fps may not be achievable.
+
+        if self.debug:
+            if self.avgFrameTime==0:
+                self.avgFrameTime=loopTime
+            else:
+                self.avgFrameTime=(self.avgFrameTime+loopTime)/2
+
+            print "Animator.run() Frame animations took average of %.6f seconds" % (self.avgFrameTime)
+
+        # the frame is finished, move the clock on
+        self.clock.frameDone()
+
+        return frameChanged
+
+    def debugReport(self,t0):
+        """
+        prints the scheduling, pipeline and static frame stats every jitterReportInterval seconds when debugging
+
+        :param float t0: start time of the current frame (monotonic seconds)
+        :return: Nothing
+        """
+        if self.debug and (t0-self.lastReport)>=self.jitterReportInterval:
+            print "Animator.run()",self.frameScheduler.reportJitter()
+            if Panel.pipelined: print "Animator.run()",Panel.ReportPipeline(self.frameInterval)
+            if self.skipStaticFrames: print "Animator.run() static frames skipped=",self.staticFrames
+            self.lastReport=t0
+
+    def waitWhilePaused(self):
+        """
+        blocks the run loop until resume() or stop() is called then moves the frame schedule on
+        by the time spent paused so animations continue from where they were
+
+        :return: Nothing
+        """
+        if self.debug: print "Animator.run() paused"
+
+        pausedAt=monotonic()
+        self.playing.wait()
+        self.frameScheduler.shift(monotonic()-pausedAt)
+
+        if self.debug: print "Animator.run() resumed"
@@ -0,0 +1,210 @@
+"""
+AsyncDriver.py
+
+Runs an Animator on an asyncio event loop instead of its own thread, for programs which also
+handle sensors, sockets etc. with asyncio.
+
+Frames are scheduled with loop.call_at() on the Animator's FrameScheduler deadlines, so the loop
+sleeps between frames. Each frame is rendered and sent to the Panel by an executor (the loop's
+default thread pool unless one is given) so the loop is free to run other coroutines while a frame
+is being drawn. Only one frame is ever in progress.
+
+With a clock which is not real time (see Clock.py) each frame is started as soon as the last one
+is done.
+
+Pausing uses the Animator's own playing Event so Animator.pause(), resume() and isPaused(), and the
+ControlServer pause and resume commands, work the same as with Animator.run(). A paused frame waits
+in the executor, as the run loop would, so one executor thread is held until the show is resumed.
+
+Python 2 needs trollius, the asyncio backport (pip install trollius). Only callbacks are used so the
+same code runs with asyncio on Python 3.
+
+usage:-
+
+    loop=asyncio.get_event_loop()
+    driver=AsyncDriver(animator=A)
+    done=driver.start()         # a Future which completes when the show stops
+    ...
+    loop.run_until_complete(done)
+
+    driver.stop() may be called from a callback or coroutine running on the loop.
+
+"""
+
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+from UtilLib import monotonic
+
+
+class AsyncDriver(object):
+    """
+    Parameters:-
+
+    animator    the Animator to run (required)
+    loop        event loop, None uses asyncio.get_event_loop()
+    executor    concurrent.futures executor for rendering, None uses the loop's default
+    """
+
+    animator=None
+    loop=None
+    executor=None
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.animator is not None,"AsyncDriver() animator not set."
+        assert self.animator.fps is not None,"AsyncDriver() animator fps not set."
+
+        if self.loop is None: self.loop=asyncio.get_event_loop()
+
+        self.done=None          # Future, completes when the show stops
+        self.handle=None        # the next frame, from call_at() or call_soon()
+        self.rendering=False    # True whilst a frame is with the executor, including a paused one
+
+    def start(self,reset=True):
+        """
+        starts the show. The first frame is drawn straight away.
+
+        :param bool reset: start the animations from the beginning
+        :return Future: completes when the show has stopped. Its exception is set if a frame failed.
+        """
+        assert self.done is None or self.done.done(),"AsyncDriver.start() the show is already running."
+
+        if reset: self.animator.reset()
+
+        self.done=asyncio.Future(loop=self.loop)
+        self.animator.playing.set()
+
+        # startRun() marks the start of the first frame
+        self.animator.startRun()
+        self.handle=self.loop.call_soon(self._startFrame,None,True)
+        return self.done
+
+    def stop(self):
+        """
+        stops the show after the frame in progress, if any
+
+        :return: Nothing
+        """
+        self.animator.running=False
+        self._cancelFrame()
+
+        # a paused frame must wake up to see it has been stopped
+        self.animator.playing.set()
+
+        # a frame with the executor finishes the show when it comes back
+        if not self.rendering: self._finish()
+
+    def pause(self):
+        """
+        holds the show at the start of the next frame until resume(), see Animator.pause()
+
+        :return: Nothing
+        """
+        self.animator.pause()
+
+    def resume(self):
+        """
+        carries on from where pause() stopped the show, see Animator.resume()
+
+        :return: Nothing
+        """
+        self.animator.resume()
+
+    def isPaused(self):
+        return self.animator.isPaused()
+
+    def _startFrame(self,due=None,first=False):
+        """
+        hands the current frame to the executor
+
+        :param float due: when the frame was due, None if the clock is not real time
+        :param bool first: True for the first frame
+        :return: Nothing
+        """
+        self.handle=None
+        if not self.animator.running: return
+
+        if not first:
+            if due is not None:
+                self.animator.frameScheduler.beginFrame(due)
+            else:
+                self.animator.frameScheduler.startNextFrame()
+
+        self.rendering=True
+        future=self.loop.run_in_executor(self.executor,self._renderFrame)
+        future.add_done_callback(self._frameDone)
+
+    def _renderFrame(self):
+        """
+        runs in the executor, renders the frame unless the show has been paused, in which case it
+        waits for resume() or stop() first, as Animator.runLoop() does
+
+        :return: Nothing
+        """
+        if not self.animator.playing.is_set():
+            self.animator.waitWhilePaused()
+            if not self.animator.running: return
+
+        self.animator.runFrame()
+
+    def _frameDone(self,future):
+        """
+        called on the loop when the executor has finished a frame
+
+        :param Future future: from run_in_executor()
+        :return: Nothing
+        """
+        self.rendering=False
+
+        if future.exception() is not None:
+            self.animator.running=False
+            self._finish(future.exception())
+            return
+
+        if not self.animator.running:
+            self._finish()
+            return
+
+        self.animator.debugReport(monotonic())
+        self._scheduleFrame()
+
+    def _scheduleFrame(self):
+        """
+        asks the loop to start the next frame when it is due
+
+        :return: Nothing
+        """
+        if not self.animator.clock.isRealTime:
+            self.handle=self.loop.call_soon(self._startFrame)
+            return
+
+        due=self.animator.frameScheduler.nextDue()
+
+        # the FrameScheduler and the loop may use different clocks so convert the delay
+        self.handle=self.loop.call_at(self.loop.time()+max(0.0,due-monotonic()),self._startFrame,due)
+
+    def _cancelFrame(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle=None
+
+    def _finish(self,exception=None):
+        """
+        tidies up and completes the done Future
+
+        :param exception: the exception which stopped the show, if any
+        :return: Nothing
+        """
+        if self.done is None or self.done.done(): return
+
+        self.animator.endRun()
+
+        if exception is not None:
+            self.done.set_exception(exception)
+        else:
+            self.done.set_result(self.animator.frameScheduler.frameCount)
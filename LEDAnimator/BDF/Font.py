@@ -193,6 +193,9 @@ class Font():
         if not isinstance(fgColor, Palette):
             fgColor = channelSwap(fgColor)
 
+        # the glyphs are pasted together, see blitMany()
+        blits=[]
+
         for ch in text:
 
             char=self.getChar(ch)
@@ -204,7 +207,10 @@ class Font():
             else:
                 char = self._ColorGlyph(char, fgColor)
 
-            x=pasteWithAlphaAt(image, x+1, y, char)
+            blits.append((char, x+1, y))
+            x=x+1+char.shape[1]
+
+        blitMany(image, blits)
 
         return x
 
@@ -0,0 +1,70 @@
+"""
+BufferPool.py
+
+Shares layer buffers between animations.
+
+A show may create hundreds of animations but each layer only ever plays one of them at a time. Instead
+of every animation owning a buffer the size of the Panel, an animation takes one from the pool when it
+starts (AnimBase.reset()) and gives it back when it ends. Buffers are kept for re-use so once the show has
+been round once no more are allocated.
+
+Buffers are pooled by size because zones (see Zone.py) use layer buffers the size of the zone.
+
+usage:-
+
+    buffer=BufferPool.acquire(width,height)
+    ...
+    BufferPool.release(buffer)
+
+"""
+
+import threading
+import NumpyImage
+
+_free={}                    # (width,height): list of NumpyImage
+_lock=threading.Lock()      # layers may be stepped on a thread pool, see Animator layerMode
+_allocated=0                # buffers created
+_inUse=0                    # buffers handed out and not yet released
+
+
+def acquire(width,height):
+    """
+    :param int width: buffer width in pixels
+    :param int height: buffer height in pixels
+    :return NumpyImage: a transparent buffer
+    """
+    global _allocated,_inUse
+
+    with _lock:
+        free=_free.get((width,height))
+        buffer=free.pop() if free else None
+        if buffer is None: _allocated+=1
+        _inUse+=1
+
+    if buffer is None:
+        return NumpyImage.NumpyImage(width=width,height=height,alpha=0)
+
+    buffer.clear()
+    return buffer
+
+def release(buffer):
+    """
+    returns a buffer to the pool. The caller must not use it again.
+
+    :param NumpyImage buffer: from acquire()
+    :return: Nothing
+    """
+    global _inUse
+
+    with _lock:
+        _free.setdefault((buffer.width,buffer.height),[]).append(buffer)
+        _inUse-=1
+
+def getStats():
+    """
+    :return dict: allocated, inUse and free buffer counts
+    """
+    with _lock:
+        return {"allocated":_allocated,
+                "inUse":_inUse,
+                "free":sum(len(free) for free in _free.itervalues())}
@@ -35,6 +35,18 @@ import colorsys
 from matplotlib.colors import *
 
 import Helpers.AntiAlias as AA
+import Scratch
+from QualityGovernor import QualityKnob
+
+# when False anti-aliased chains only draw their main pixels (alias factor>=0.5) at full brightness
+# turned off by the QualityGovernor when the Animator cannot keep up
+antiAliasing=True
+
+def setAntiAliasing(enabled):
+    global antiAliasing
+    antiAliasing=enabled
+
+antiAliasKnob=QualityKnob(name="chain anti-aliasing",levels=[True,False],apply=setAntiAliasing,priority=2)
 
 ##########################################################
 #
@@ -81,6 +93,7 @@ class Chain():
             self.alias=np.array(v)
             self.hsv = np.zeros((len(x), 5), dtype=np.float)
             self.hsv[...,ALIAS] = v  # whatever the AA routine chooses
+            self.primary=self.alias>=0.5    # pixels drawn when antiAliasing is off
         else:
             # split the xyList into two
             xList,yList=zip(*xyList)
@@ -242,13 +255,22 @@ class Chain():
 
         The pixelsd are adjusted for alpha, brightness and Alias
 
+        The colors are a Scratch array (see Scratch.py), use them before the next call.
+
         :return numpy ndarray x,numpy ndarray y,numpy ndarray colors: x,y,rgba
         """
         # we are going to mod the brightness of the output only
         # we don't want to change the stored pixels
 
-        tmp=self.hsv.copy()
-        tmp[...,HSV_V]*=tmp[...,ALIAS]*self.brightness
+        if self.AAmethod is not None and not antiAliasing:
+            x,y=self.x[self.primary],self.y[self.primary]
+            tmp=self.hsv[self.primary]
+            tmp[...,HSV_V]*=self.brightness
+        else:
+            x,y=self.x,self.y
+            tmp=Scratch.get("Chain.getAllPixels",self.hsv.shape,self.hsv.dtype)
+            tmp[...]=self.hsv
+            tmp[...,HSV_V]*=tmp[...,ALIAS]*self.brightness
         tmp[...,ALPHA]*=self.alpha
         # use matplotlib to convert to rgb
         tmp[:, :3] = hsv_to_rgb(tmp[:, :3])  # only the HSV channels are used
@@ -260,7 +282,7 @@ class Chain():
             # swap channels
             tmp[[RGB_R, RGB_B]] = tmp[[RGB_B, RGB_R]]
 
-        return self.x,self.y,tmp[:,:4]  # don't need the alias info
+        return x,y,tmp[:,:4]  # don't need the alias info
 
 
     def getLength(self):
@@ -8,10 +8,12 @@ Sub-class of AnimBase
 
 """
 from AnimBase import AnimBase
+import Chain
 
 class ChainAnimBase(AnimBase):
-    # nothing extra is added
-    pass
+
+    def getQualityKnobs(self):
+        return [Chain.antiAliasKnob]
 
 
 
@@ -31,7 +31,7 @@ class Sparkle(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -53,7 +53,7 @@ class SparkleRandom(ChainAnimBase):
     """
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         self.chain.setAllPixelsRandom()
@@ -81,7 +81,7 @@ class Comet(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -124,7 +124,7 @@ class Comets(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         chainLen=self.chain.getLength()
@@ -181,7 +181,7 @@ class Pulse(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -206,7 +206,7 @@ class AltOnOff(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         # get first color
@@ -239,7 +239,7 @@ class On(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -260,7 +260,7 @@ class Fade(ChainAnimBase):
     """
     Fade is the base class for FadeIn,FadeOut and FadeInOut
 
-    Fade takes place over duration time
+    Fade takes place over duration time by changing the layer opacity
     """
 
     direction=1     # fade in by default
@@ -269,19 +269,20 @@ class Fade(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
             self.c=self.getNextPaletteEntry().getPixelColor()
             self.chain.setAllPixels(self.c)
+            self.chain.setChainBrightness(1.0)
             self.alpha=0.0 if self.direction > 0 else 1.0
             self.rate=0.1
             self.totalTicks=self.fps*self.duration
             self.init=False
         else:
             # we want the brightness to go from zero to 1.0 in duration seconds
-            self.alpha= (time.time() - self.startTime) / self.duration
+            self.alpha= (self.now() - self.startTime) / self.duration
             if self.direction>0:
                 if self.alpha>=1.0:
                     self.animationHasFinished()
@@ -292,7 +293,8 @@ class Fade(ChainAnimBase):
                     self.animationHasFinished()
                     self.alpha=0
 
-        self.chain.setChainBrightness(self.alpha)
+        # square law, as setChainBrightness()
+        self.opacity=self.alpha*self.alpha
         self.refreshCanvas()
 
 class FadeIn(Fade):
@@ -356,7 +358,7 @@ class Larson(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -504,7 +506,7 @@ class WipeIn(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         self.chainLen = self.chain.getLength()
@@ -538,7 +540,7 @@ class WipeOut(ChainAnimBase):
 
     def step(self, chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         self.chainLen = self.chain.getLength()
@@ -579,7 +581,7 @@ class Wipe(ChainAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         self.chainLen = self.chain.getLength()
@@ -0,0 +1,126 @@
+"""
+Clock.py
+
+All animation timing goes through a clock so that a show can be run against real time or against
+a clock which is moved on by the program.
+
+WallClock       real time, time.time(). The default.
+VirtualClock    time only changes when set() or advance() is called. Useful for tests and for
+                rendering a particular moment of a show.
+SteppedClock    a VirtualClock which moves on by exactly one frame interval each time the Animator
+                finishes a frame. Frames are rendered as fast as possible, without waiting, and the
+                same show always produces the same frames.
+
+The Animator owns the clock and passes it to every layer. Animations use AnimBase.now() which
+returns the timestamp of the current frame, taken from the clock.
+
+usage:-
+
+    A=Animator(fps=FPS,clock=SteppedClock(fps=FPS))
+
+"""
+
+import time
+
+
+class WallClock(object):
+    """
+    real time
+    """
+
+    isRealTime=True     # the Animator waits between frames
+
+    def now(self):
+        """
+        :return float: seconds
+        """
+        return time.time()
+
+    def frameDone(self):
+        """
+        called by the Animator at the end of every frame
+        """
+        pass
+
+
+class VirtualClock(object):
+    """
+    Parameters:-
+
+    start   initial time in seconds (default 0.0)
+    """
+
+    isRealTime=False    # the Animator does not wait between frames
+    start=0.0
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        self.time=float(self.start)
+
+    def now(self):
+        """
+        :return float: seconds
+        """
+        return self.time
+
+    def set(self,t):
+        """
+        :param float t: new time in seconds
+        :return: Nothing
+        """
+        self.time=float(t)
+
+    def advance(self,seconds):
+        """
+        :param float seconds: amount to move the clock on by
+        :return: Nothing
+        """
+        self.time+=seconds
+
+    def frameDone(self):
+        pass
+
+
+class SteppedClock(VirtualClock):
+    """
+    Parameters:-
+
+    fps     frames per second (required). The clock moves on by 1/fps after every frame.
+    start   initial time in seconds (default 0.0)
+    """
+
+    fps=None
+
+    def __init__(self,**kwargs):
+        super(SteppedClock,self).__init__(**kwargs)
+
+        assert self.fps is not None,"SteppedClock() fps not set."
+
+        # if fps is integer 1/fps would be integer zero!
+        self.interval=1.0/self.fps
+        self.frame=0
+
+    def now(self):
+        # calculated from the frame number so rounding errors don't build up
+        return self.start+self.frame*self.interval
+
+    def set(self,t):
+        """
+        moves the clock to the frame nearest to time t
+
+        :param float t: time in seconds
+        :return: Nothing
+        """
+        self.frame=int(round((t-self.start)/self.interval))
+
+    def advance(self,seconds):
+        self.set(self.now()+seconds)
+
+    def frameDone(self):
+        self.frame+=1
+
+
+# used when an animation has not been given a clock
+wallClock=WallClock()
@@ -44,6 +44,15 @@ RGB_B=0
 ALPHA=3
 ALIAS=4 # used by chains
 
+# image alpha classes, see UtilLib.classifyAlpha()
+ALPHA_OPAQUE=0          # every pixel alpha is 255
+ALPHA_TRANSPARENT=1     # every pixel alpha is 0
+ALPHA_MASK=2            # pixel alphas are 0 or 255
+ALPHA_GENERAL=3         # anything else
+
+# layer blend modes, see AnimBase.blendMode and UtilLib.blendModeInt()
+BLEND_MODES=("over","add","multiply","screen","max")
+
 # used by Font to handle font types differently
 BDF_FONTTYPE=0
 HERSHEY_FONTTYPE=1
@@ -0,0 +1,259 @@
+"""
+ControlServer.py
+
+Lets other programs control a running show through a Unix domain socket, without restarting it.
+
+The Animator starts a ControlServer when controlSocket is set. Commands are sent one per line and
+each gets a one line reply starting with OK or ERROR. Commands are checked when they arrive then
+queued on the Animator and applied at the start of the next frame (see Animator.queueCommand()).
+
+Commands:-
+
+    jump <layer> <entry>        start entry <entry> (0 is the first) of the layer's AnimSequence
+    sequence <layer> <name>     replace the layer's AnimSequence with one from Animator.sequences
+    fps <fps>                   change the Animator frame rate
+    brightness <percent>        change the Panel brightness, 0 to 100
+    pause                       hold the show on the current frame
+    resume                      carry on from where it was paused
+    status                      fps, brightness, paused and the sequence entry each layer is playing
+
+<layer> is the layer number, 0 is the bottom layer, or the id given to Animator.addAnimation().
+
+pause and resume use Animator.playing which both Animator.run() and AsyncDriver check at the start of
+each frame, so they work whichever is running the show.
+
+Layer commands are not available with layerMode="processes" because the worker processes have their
+own copies of the layers.
+
+usage:-
+
+    A=Animator(fps=FPS,controlSocket="/tmp/LEDAnimator.sock",sequences={"xmas":XMAS_SEQ})
+
+    then, from a shell:-
+
+    python -m LEDAnimator.ControlServer /tmp/LEDAnimator.sock jump 0 3
+
+"""
+
+import os
+import sys
+import socket
+import threading
+import SocketServer
+
+
+class ControlHandler(SocketServer.StreamRequestHandler):
+    """
+    reads commands from one connection until it is closed
+    """
+
+    def handle(self):
+        for line in iter(self.rfile.readline,""):
+            line=line.strip()
+            if not line: continue
+            self.wfile.write(self.server.control.execute(line)+"\n")
+            self.wfile.flush()
+
+
+class UnixServer(SocketServer.ThreadingMixIn,SocketServer.UnixStreamServer):
+    daemon_threads=True     # connections left open don't stop the program exiting
+
+
+class ControlServer(object):
+    """
+    Parameters:-
+
+    animator    the Animator to control (required)
+    path        path of the Unix domain socket (required)
+    verbose     print each command received
+    """
+
+    animator=None
+    path=None
+    verbose=True
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.animator is not None,"ControlServer() animator not set."
+        assert self.path is not None,"ControlServer() path not set."
+
+        self.server=None
+        self.serverThread=None
+
+        self.commands={"jump":self.jump,
+                       "sequence":self.sequence,
+                       "fps":self.fps,
+                       "brightness":self.brightness,
+                       "pause":self.pause,
+                       "resume":self.resume,
+                       "status":self.status}
+
+    def start(self):
+        """
+        starts listening on the socket in a background thread
+
+        :return: Nothing
+        """
+        if os.path.exists(self.path):
+            # left behind by a show which did not exit cleanly, unless something is still listening
+            assert not socketInUse(self.path),"ControlServer.start() "+self.path+" is in use."
+            os.unlink(self.path)
+
+        self.server=UnixServer(self.path,ControlHandler)
+        self.server.control=self
+
+        self.serverThread=threading.Thread(target=self.server.serve_forever)
+        self.serverThread.daemon=True
+        self.serverThread.start()
+
+        print "ControlServer listening on",self.path
+
+    def stop(self):
+        """
+        stops listening and removes the socket
+
+        :return: Nothing
+        """
+        if self.server is None: return
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.server=None
+
+        if os.path.exists(self.path): os.unlink(self.path)
+
+    def execute(self,line):
+        """
+        checks and queues one command
+
+        :param str line: the command and its parameters separated by spaces
+        :return str: reply starting with OK or ERROR
+        """
+        if self.verbose: print "ControlServer received:",line
+
+        words=line.split()
+        command=self.commands.get(words[0].lower())
+        if command is None:
+            return "ERROR unknown command "+words[0]
+
+        try:
+            return command(*words[1:])
+        except TypeError:
+            return "ERROR wrong number of parameters for "+words[0]
+        except (AssertionError,ValueError) as e:
+            return "ERROR "+str(e)
+
+    def getLayer(self,layer):
+        """
+        :param str layer: layer number or id
+        :return AnimInfo: the layer
+        """
+        assert self.animator.layerProcesses is None,"layer commands cannot be used with layerMode 'processes'"
+
+        return self.animator.getLayer(int(layer) if layer.isdigit() else layer)
+
+    # the commands
+
+    def jump(self,layer,entry):
+        animInfo=self.getLayer(layer)
+        entry=int(entry)
+        assert 0<=entry<animInfo.animSeq.listLen,"entry should be 0 to "+str(animInfo.animSeq.listLen-1)
+
+        self.animator.queueCommand(animInfo.jumpTo,entry)
+        return "OK"
+
+    def sequence(self,layer,name):
+        animInfo=self.getLayer(layer)
+        assert self.animator.sequences is not None and name in self.animator.sequences,"no sequence called "+name
+
+        self.animator.queueCommand(animInfo.setSequence,self.animator.sequences[name])
+        return "OK"
+
+    def fps(self,fps):
+        fps=float(fps)
+        assert fps>0,"fps should be greater than zero"
+
+        self.animator.queueCommand(self.animator.setFps,fps)
+        return "OK"
+
+    def brightness(self,percent):
+        import Panel
+
+        percent=int(percent)
+        assert 0<=percent<=100,"brightness should be 0 to 100"
+
+        self.animator.queueCommand(Panel.SetBrightness,percent)
+        return "OK"
+
+    def pause(self):
+        # takes effect at the start of the next frame, under run() or an AsyncDriver
+        self.animator.pause()
+        return "OK"
+
+    def resume(self):
+        # the run loop, or the AsyncDriver frame, is waiting so this cannot be queued
+        self.animator.resume()
+        return "OK"
+
+    def status(self):
+        import Panel
+
+        layers=[]
+        for n,animInfo in enumerate(self.animator.animations):
+            # curAnim has already moved on to the entry after the one playing
+            entry=(animInfo.animSeq.curAnim-1) % animInfo.animSeq.listLen if animInfo.animFunc is not None \
+                  else animInfo.animSeq.curAnim
+            layers.append("%d:%s=%d/%d" % (n,animInfo.id,entry,animInfo.animSeq.listLen))
+
+        return "OK fps=%s brightness=%d paused=%s layers=%s" % \
+               (str(self.animator.fps),Panel.brightness,str(self.animator.isPaused()),",".join(layers))
+
+
+def socketInUse(path):
+    """
+    :param str path: Unix domain socket path
+    :return bool: True if something is listening on it
+    """
+    sock=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+def sendCommand(path,command,timeout=5.0):
+    """
+    sends one command to a running show
+
+    :param str path: Unix domain socket path
+    :param str command: the command, see above
+    :param float timeout: seconds to wait for the reply
+    :return str: the reply
+    """
+    sock=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        sock.sendall(command.strip()+"\n")
+        reply=sock.makefile("r").readline()
+    finally:
+        sock.close()
+    return reply.strip()
+
+def main(argv=None):
+    argv=sys.argv[1:] if argv is None else argv
+    if len(argv)<2:
+        print "usage: python -m LEDAnimator.ControlServer <socket> <command> [parameters]"
+        return 1
+
+    reply=sendCommand(argv[0]," ".join(argv[1:]))
+    print reply
+    return 0 if reply.startswith("OK") else 1
+
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+DirtyRects.py
+
+Works out which rectangles of the Panel have changed since the last frame so the Animator only
+clears, blends and sends those rectangles. A scrolling ticker only changes its strip and a small
+sprite only touches where it was and where it is now.
+
+Each layer's output is a list of (x,y,image,opacity,premultiplied,blendMode) draws (see AnimBase.drawLayer()). A draw
+which differs from the same draw on the last frame marks its old and new rectangles as changed.
+Each changed rectangle is cleared to the background colour and every layer is blended again,
+bottom layer first, within it. The rest of the frameBuffer still holds the last frame.
+
+The whole Panel is redrawn on the first frame, when the background colour changes or when the
+changes cover more than maxArea of the Panel.
+
+With pipelined output (see Panel.StartPipeline()) UpdateDisplay() hands back a frameBuffer which
+still holds the frame it was last drawn with, a few frames ago. BufferHistory remembers the
+rectangles changed on the last few frames so only their union since then is redrawn in it.
+
+usage:-
+
+    A=Animator(fps=FPS,dirtyRects=True)
+
+"""
+
+import zlib
+import numpy as np
+import Panel
+from UtilLib import pasteWithAlphaAt,nearest
+
+
+class DirtyRects(object):
+    """
+    Parameters:-
+
+    maxRects    more changed rectangles than this are merged into one
+    maxArea     fraction of the Panel, if the changes cover more the whole Panel is redrawn
+    """
+
+    maxRects=8
+    maxArea=0.5
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        self.reset()
+
+    def reset(self):
+        """
+        forgets the last frame so the next one is drawn in full
+
+        :return: Nothing
+        """
+        self.lastDraws=None
+        self.lastBgColor=None
+        self.history=BufferHistory()
+
+    def findChanges(self,panel,layerTargets):
+        """
+        compares this frame's layer output with the last frame's
+
+        :param panel: the Panel or a Zone
+        :param list layerTargets: a list of (x,y,image,opacity,premultiplied,blendMode) tuples for each layer
+        :return list: (x0,y0,x1,y1) rectangles which have changed, None if the whole Panel has changed
+        """
+        width,height=panel.frameBuffer.width,panel.frameBuffer.height
+
+        draws=[[self.describe(draw,width,height) for draw in layerTarget] for layerTarget in layerTargets]
+
+        redrawAll=self.lastDraws is None or len(self.lastDraws)<>len(draws) or panel.panelBgColor<>self.lastBgColor
+
+        lastDraws=self.lastDraws
+        self.lastDraws=draws
+        self.lastBgColor=panel.panelBgColor
+
+        if redrawAll: return None
+
+        rects=[]
+        for old,new in zip(lastDraws,draws):
+            for n in xrange(max(len(old),len(new))):
+                oldDraw=old[n] if n<len(old) else None
+                newDraw=new[n] if n<len(new) else None
+                if oldDraw==newDraw: continue
+
+                for draw in (oldDraw,newDraw):
+                    if draw is not None and draw[0] is not None: rects.append(draw[0])
+
+        return self.limit(rects,width,height)
+
+    def findRedraw(self,panel,rects):
+        """
+        works out what must be redrawn in the frameBuffer, which may hold an older frame than the last one
+
+        :param panel: the Panel or a Zone
+        :param list rects: this frame's changes, from findChanges()
+        :return list: (x0,y0,x1,y1) rectangles to redraw, None if the whole Panel must be redrawn
+        """
+        rects=self.history.findRedraw(panel.frameBuffer,rects)
+        if rects is None: return None
+
+        return self.limit(rects,panel.frameBuffer.width,panel.frameBuffer.height)
+
+    def limit(self,rects,width,height):
+        """
+        :param list rects: (x0,y0,x1,y1) rectangles
+        :param int width: Panel width
+        :param int height: Panel height
+        :return list: at most maxRects rectangles which do not overlap, None if they cover more than maxArea
+        """
+        rects=mergeRects(rects)
+        if len(rects)>self.maxRects:
+            rects=[boundingRect(rects)]
+
+        if sum((x1-x0)*(y1-y0) for x0,y0,x1,y1 in rects)>self.maxArea*width*height:
+            return None
+
+        return rects
+
+    def describe(self,draw,width,height):
+        """
+        :param tuple draw: (x,y,image,opacity,premultiplied,blendMode)
+        :param int width: Panel width
+        :param int height: Panel height
+        :return tuple: (rectangle on the Panel or None if off the Panel, signature of the draw)
+        """
+        x,y,image,opacity,premultiplied,blendMode=draw
+        x0,y0=nearest(x),nearest(y)
+        h,w=image.shape[:2]
+
+        rect=(max(x0,0),max(y0,0),min(x0+w,width),min(y0+h,height))
+        if rect[2]<=rect[0] or rect[3]<=rect[1]: rect=None
+
+        return rect,(x0,y0,opacity,premultiplied,blendMode,image.shape,zlib.adler32(np.ascontiguousarray(image)))
+
+    def redraw(self,panel,layerTargets,rects):
+        """
+        clears the rectangles and blends every layer within them, bottom layer first
+
+        :param panel: the Panel or a Zone
+        :param list layerTargets: a list of (x,y,image,opacity,premultiplied,blendMode) tuples for each layer
+        :param list rects: from findChanges()
+        :return: Nothing
+        """
+        for x0,y0,x1,y1 in rects:
+            panel.Clear((x0,y0,x1,y1))
+            region=panel.frameBuffer.out[y0:y1,x0:x1]
+
+            for layerTarget in layerTargets:
+                for x,y,image,opacity,premultiplied,blendMode in layerTarget:
+                    pasteWithAlphaAt(region,nearest(x)-x0,nearest(y)-y0,image,opacity,premultiplied,Panel.integerBlend,
+                                     blendMode=blendMode)
+
+
+class BufferHistory(object):
+    """
+    remembers the rectangles changed on the last few frames so a frameBuffer which was last drawn some frames
+    ago (see Panel pipelined output) is only redrawn where the frame has changed since then
+
+    Parameters:-
+
+    maxFrames   frames remembered, a buffer last drawn longer ago is redrawn in full
+    """
+
+    maxFrames=8
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        self.frame=0
+        self.changes=[]     # rectangles changed on each of the last maxFrames frames, None for all of it
+        self.drawnOn={}     # frameBuffer: frame it was last drawn on
+
+    def findRedraw(self,buffer,rects):
+        """
+        records this frame's changes and works out what must be drawn in the buffer
+
+        :param buffer: the frameBuffer about to be drawn
+        :param list rects: (x0,y0,x1,y1) rectangles changed since the last frame, None for all of it
+        :return list: rectangles changed since the buffer was last drawn, None if it must be drawn in full
+        """
+        self.frame+=1
+        self.changes.append(rects)
+        if len(self.changes)>self.maxFrames: del self.changes[0]
+
+        last=self.drawnOn.get(buffer)
+        self.drawnOn[buffer]=self.frame
+
+        # buffers which have not been used for a while, e.g. after StopPipeline(), are forgotten
+        for old in [b for b,frame in self.drawnOn.iteritems() if self.frame-frame>self.maxFrames]:
+            del self.drawnOn[old]
+
+        if last is None or self.frame-last>len(self.changes): return None
+
+        union=[]
+        for changed in self.changes[last-self.frame:]:
+            if changed is None: return None
+            union.extend(changed)
+
+        return union
+
+
+def mergeRects(rects):
+    """
+    merges rectangles which overlap so no pixel is blended twice
+
+    :param list rects: (x0,y0,x1,y1) rectangles
+    :return list: rectangles which do not overlap
+    """
+    merged=[]
+    for rect in rects:
+        while True:
+            for other in merged:
+                if rect[0]<other[2] and other[0]<rect[2] and rect[1]<other[3] and other[1]<rect[3]:
+                    merged.remove(other)
+                    rect=boundingRect([rect,other])
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+def boundingRect(rects):
+    """
+    :param list rects: (x0,y0,x1,y1) rectangles
+    :return tuple: the smallest rectangle containing them all
+    """
+    return (min(r[0] for r in rects),min(r[1] for r in rects),max(r[2] for r in rects),max(r[3] for r in rects))
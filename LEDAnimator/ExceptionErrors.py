@@ -102,4 +102,7 @@ class InvalidScale(Error):
 
 class UnsupportedFont(Error):
     """ A request was made for an unsupported font """
-    pass
\ No newline at end of file
+    pass
+class LayerProcessFailed(Error):
+    """ A layer running in a worker process raised an exception or stopped responding """
+    pass
@@ -0,0 +1,360 @@
+"""
+FrameScheduler.py
+
+Decides when the Animator should start the next frame.
+
+Two modes are available:-
+
+"busywait"  the original behaviour. Each frame is timed from its own start and the loop spins until
+            1/fps seconds have passed. Simple but it keeps a CPU core at 100% doing nothing and, since
+            every frame is timed from the previous one, small delays add up over a long show.
+
+"deadline"  frames are due at absolute times start+n/fps taken from a monotonic clock. The scheduler
+            sleeps for most of the wait and only spins for the last spinTail seconds to hit the deadline
+            accurately. Because deadlines are absolute the show does not drift.
+
+The scheduler also records how late each frame actually started (jitter) so the two modes can be compared.
+
+When a frame overruns, overrunPolicy decides what happens to the show time seen by the animations:-
+
+"drop"      show time follows the wall clock. Late frames are simply not rendered so animations stay in step
+            with real time but may look jerky. This is how the Animator has always behaved.
+"slow"      show time advances by at most one frame interval per frame. Nothing is skipped, the show slows
+            down while the CPU is overloaded and does not try to catch up afterwards.
+"fixed"     show time advances by exactly one frame interval per frame and the deadline mode renders frames
+            back to back until it has caught up with the schedule. Every frame is rendered.
+
+getShowTime() returns the show time (seconds since start()) for the current frame. The Animator passes it to
+every layer so that all animations in a frame see the same timestamp.
+
+usage:-
+
+    sched=FrameScheduler(fps=100,mode="deadline",spinTail=0.002)
+    sched.start()
+    while running:
+        ... render a frame ...
+        sched.waitForNextFrame()
+
+"""
+
+import time
+import math
+from UtilLib import monotonic
+
+BUSYWAIT="busywait"
+DEADLINE="deadline"
+
+# overrun policies
+DROP="drop"
+SLOW="slow"
+FIXED="fixed"
+
+class JitterStats(object):
+    """
+    Collects frame start timing so that scheduling accuracy can be reported.
+
+    lateness is how long after its due time a frame actually started
+    period is the time between the starts of consecutive frames
+    """
+
+    def __init__(self,interval):
+        self.interval=interval
+        self.reset()
+
+    def reset(self):
+        self.frames=0
+        self.sumLate=0.0
+        self.maxLate=0.0
+        self.sumPeriod=0.0
+        self.sumPeriodSq=0.0
+        self.lastStart=None
+        self.firstStart=None
+
+    def record(self,due,actual):
+        """
+        record the start of a frame
+
+        :param float due: when the frame should have started (monotonic seconds)
+        :param float actual: when it actually started (monotonic seconds)
+        :return None:
+        """
+        late=max(0.0,actual-due)
+        self.sumLate+=late
+        self.maxLate=max(self.maxLate,late)
+
+        if self.lastStart is not None:
+            period=actual-self.lastStart
+            self.sumPeriod+=period
+            self.sumPeriodSq+=period*period
+        else:
+            self.firstStart=actual
+
+        self.lastStart=actual
+        self.frames+=1
+
+    def getStats(self):
+        """
+        :return dict: frames, meanLate, maxLate, meanPeriod, periodStdDev and drift (seconds)
+        """
+        periods=self.frames-1
+        meanPeriod=self.sumPeriod/periods if periods>0 else 0.0
+        variance=(self.sumPeriodSq/periods-meanPeriod*meanPeriod) if periods>0 else 0.0
+
+        # drift is how far behind the ideal timeline the last frame started
+        drift=0.0
+        if periods>0:
+            drift=(self.lastStart-self.firstStart)-periods*self.interval
+
+        return {"frames":self.frames,
+                "meanLate":self.sumLate/self.frames if self.frames else 0.0,
+                "maxLate":self.maxLate,
+                "meanPeriod":meanPeriod,
+                "periodStdDev":math.sqrt(max(0.0,variance)),
+                "drift":drift}
+
+    def report(self):
+        """
+        :return str: human readable summary of the stats
+        """
+        s=self.getStats()
+        return "frames=%d period mean=%.3fms stddev=%.3fms late mean=%.3fms max=%.3fms drift=%.3fms" % \
+               (s["frames"],s["meanPeriod"]*1000,s["periodStdDev"]*1000,s["meanLate"]*1000,s["maxLate"]*1000,
+                s["drift"]*1000)
+
+
+class FrameScheduler(object):
+    """
+    Paces the Animator run loop at the requested frame rate.
+
+    Parameters:-
+
+    fps         frames per second (required)
+    mode        "busywait" (default) or "deadline"
+    spinTail    deadline mode only - seconds before the deadline at which sleeping stops and spinning starts.
+                time.sleep() on a Pi can oversleep by a millisecond or so, 0.002 covers that.
+    overrunPolicy   "drop" (default), "slow" or "fixed" - see above
+    """
+
+    fps=None
+    mode=BUSYWAIT
+    spinTail=0.002
+    overrunPolicy=DROP
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.fps is not None,"FrameScheduler() fps not set."
+        assert self.mode in (BUSYWAIT,DEADLINE),"FrameScheduler() mode should be 'busywait' or 'deadline' got "+str(self.mode)
+        assert self.spinTail>=0,"FrameScheduler() spinTail cannot be negative."
+        assert self.overrunPolicy in (DROP,SLOW,FIXED),"FrameScheduler() overrunPolicy should be 'drop', 'slow' or " \
+                                                        "'fixed' got "+str(self.overrunPolicy)
+
+        # if fps is integer 1/fps would be integer zero!
+        self.interval=1.0/self.fps
+        self.stats=JitterStats(self.interval)
+        self.frameStart=None
+        self.nextDeadline=None
+        self.startTime=None
+        self.showTime=0.0
+        self.frameCount=0
+
+    def start(self):
+        """
+        anchors the schedule to now. Call just before the first frame.
+
+        :return float: the start time of the first frame (monotonic seconds)
+        """
+        now=monotonic()
+        self.stats.reset()
+        self.frameStart=now
+        self.startTime=now
+        self.nextDeadline=now+self.interval
+        self.showTime=0.0
+        self.frameCount=0
+        self.stats.record(now,now)
+        return now
+
+    def getFrameStart(self):
+        """
+        :return float: monotonic time at which the current frame started
+        """
+        return self.frameStart
+
+    def getShowTime(self):
+        """
+        :return float: show time for the current frame, seconds since start(). See overrunPolicy.
+        """
+        return self.showTime
+
+    def getDroppedFrames(self):
+        """
+        :return int: number of frames not rendered because of overruns ("drop" policy)
+        """
+        if self.overrunPolicy<>DROP: return 0
+        return max(0,int(round(self.showTime/self.interval))-self.frameCount)
+
+    def getTimeLost(self):
+        """
+        :return float: seconds the show time has fallen behind the wall clock ("slow" and "fixed" policies)
+        """
+        return (self.frameStart-self.startTime)-self.showTime
+
+    def getLoopTime(self):
+        """
+        :return float: seconds spent on the current frame so far
+        """
+        return monotonic()-self.frameStart
+
+    def waitForNextFrame(self,idle=False):
+        """
+        waits until the next frame is due then marks the start of the new frame
+
+        :param bool idle: True if the frame was not displayed. The busywait mode then sleeps like the deadline mode.
+        :return float: start time of the new frame (monotonic seconds)
+        """
+        if self.mode==DEADLINE:
+            due=self._waitDeadline()
+        else:
+            due=self._waitBusy(idle)
+
+        return self.beginFrame(due)
+
+    def nextDue(self):
+        """
+        works out when the next frame is due, on the absolute deadline grid. Call once per frame.
+
+        What happens after an overrun depends on overrunPolicy:-
+        drop - the missed deadlines are skipped, staying on the original grid
+        slow - the grid is moved to start from now
+        fixed - nothing is skipped, frames run back to back until the schedule has caught up
+
+        :return float: the time the next frame is due (monotonic seconds)
+        """
+        due=self.nextDeadline
+
+        now=monotonic()
+        if self.overrunPolicy==DROP and now>due+self.interval:
+            # we are more than a frame late - skip the missed deadlines but stay on the original grid
+            missed=int((now-due)/self.interval)
+            due+=missed*self.interval
+        elif self.overrunPolicy==SLOW and now>due:
+            due=now
+
+        self.nextDeadline=due+self.interval
+        return due
+
+    def beginFrame(self,due):
+        """
+        marks the start of a new frame. Used by waitForNextFrame() and by callers which do
+        their own waiting, see AsyncDriver.py
+
+        :param float due: when the frame should have started (monotonic seconds)
+        :return float: start time of the new frame (monotonic seconds)
+        """
+        now=monotonic()
+        self.stats.record(due,now)
+
+        # advance the show time according to the overrun policy
+        if self.overrunPolicy==DROP:
+            self.showTime=now-self.startTime
+        elif self.overrunPolicy==SLOW:
+            self.showTime+=min(now-self.frameStart,self.interval)
+        else:
+            self.showTime+=self.interval
+
+        self.frameStart=now
+        self.frameCount+=1
+        return now
+
+    def shift(self,seconds):
+        """
+        moves the schedule on, used when the Animator has been paused so that the show carries
+        on from where it was instead of jumping forward or rushing to catch up
+
+        :param float seconds: how long the Animator was paused
+        :return: Nothing
+        """
+        self.startTime+=seconds
+        self.frameStart+=seconds
+        self.nextDeadline+=seconds
+        if self.stats.lastStart is not None:
+            self.stats.firstStart+=seconds
+            self.stats.lastStart+=seconds
+
+    def setFps(self,fps):
+        """
+        changes the frame rate from the next frame on, the schedule carries on from the current frame
+
+        :param fps: frames per second
+        :return: Nothing
+        """
+        assert fps>0,"FrameScheduler.setFps() fps should be greater than zero got "+str(fps)
+
+        self.fps=fps
+        self.interval=1.0/fps
+        self.stats.interval=self.interval
+        if self.frameStart is not None:
+            self.nextDeadline=self.frameStart+self.interval
+
+    def startNextFrame(self):
+        """
+        starts the next frame immediately without waiting. Used when the Animator's clock
+        is not real time (see Clock.py) so show time simply moves on by one interval.
+
+        :return float: start time of the new frame (monotonic seconds)
+        """
+        now=monotonic()
+        self.stats.record(now,now)
+        self.showTime+=self.interval
+        self.frameStart=now
+        self.frameCount+=1
+        return now
+
+    def _waitBusy(self,idle=False):
+        """
+        the original Animator loop - spin until interval seconds after the start of this frame
+
+        :param bool idle: sleep until spinTail seconds before the frame is due instead of spinning
+        :return float: the time the frame was due
+        """
+        due=self.frameStart+self.interval
+
+        if idle:
+            remaining=due-monotonic()
+            if remaining>self.spinTail:
+                time.sleep(remaining-self.spinTail)
+
+        while monotonic()<due:
+            pass
+        return due
+
+    def _waitDeadline(self):
+        """
+        sleep then spin until the next absolute deadline, see nextDue()
+
+        :return float: the time the frame was due
+        """
+        due=self.nextDue()
+
+        remaining=due-monotonic()
+        if remaining>self.spinTail:
+            time.sleep(remaining-self.spinTail)
+
+        while monotonic()<due:
+            pass
+
+        return due
+
+    def getJitterStats(self):
+        """
+        :return dict: see JitterStats.getStats()
+        """
+        return self.stats.getStats()
+
+    def reportJitter(self):
+        """
+        :return str: printable jitter summary including the scheduling mode
+        """
+        return "FrameScheduler("+self.mode+","+self.overrunPolicy+") "+self.stats.report()+\
+               " dropped=%d behind=%.3fs" % (self.getDroppedFrames(),self.getTimeLost())
@@ -143,6 +143,10 @@ class Image():
     def countVisible(self):
         return self.image.countVisible()
 
+    def getAlphaClass(self):
+        if self.image is None: return None
+        return self.image.getAlphaClass()
+
     #####################################################
     #
     # convenience functions to hide mechanisms and
@@ -8,6 +8,7 @@ It is here in case we need to do any pre or post processing
 """
 
 from AnimBase import AnimBase
+import NumpyImage as ni
 
 class ImageAnimBase(AnimBase):
 
@@ -16,3 +17,6 @@ class ImageAnimBase(AnimBase):
     def __init__(self,**kwargs):
 
         super(ImageAnimBase,self).__init__(**kwargs)
+
+    def getQualityKnobs(self):
+        return [ni.interpolationKnob]
@@ -53,9 +53,11 @@ class Wait(Place):
 ###################################################
 class Fade(ImageAnimBase):
     """
-    Fade a foreground image in/out by changing it's brightness and transparency
+    Fade a foreground image in/out by changing the layer opacity
 
-    By changing transparency at the same time as brightness the image will disappear rather than leaving a black hole.
+    By changing transparency the image will disappear rather than leaving a black hole. The image itself is not
+    changed, the opacity is applied when the layer is blended with the layers below. A background colour or image
+    on the same layer fades with it.
 
     The animation must specify a foreground image and a fadeRate value. Positive values denote fade in, negative values
     cause a fade out.
@@ -70,19 +72,25 @@ class Fade(ImageAnimBase):
     fadeIn=True
     fadeRate=1
 
+    def reset(self,**kwargs):
+        super(Fade,self).reset(**kwargs)
+
+        # start hidden when fading in
+        self.opacity=0.0 if self.fadeIn else 1.0
+
     def step(self, chain=None):
         # speed control
         if self.isNotNextStep():
             # refreshCanvas can cause an image to appear before
             # it has been initialised - not good for fade in
-            if not self.init: self.refreshCanvas()
+            if not self.init: self.redrawLayer()
             return
 
         # need to load the image initially but not every time
         if self.init:
             assert self.fgImage is not None,"You must supply a foreground image."
             self.fadePercent=0 if self.fadeIn else 100
-            self.fgImage.fade(self.fadePercent)
+            self.opacity=getActualBrightness(self.fadePercent)
             # finally
             self.init=False
             return
@@ -100,7 +108,8 @@ class Fade(ImageAnimBase):
             self.fadePercent=0
             self.animationHasFinished()
 
-        self.fgImage.fade(self.fadePercent)
+        # the eye has a square law response
+        self.opacity=getActualBrightness(self.fadePercent)
         self.refreshCanvas()
 
 class FadeOut(Fade):
@@ -112,8 +121,6 @@ class FadeIn(Fade):
     def __init__(self,**kwargs):
         super(Fade,self).__init__(**kwargs)
         if self.fadeRate<0: self.fadeRate=-self.fadeRate
-        if self.fgImage is not None:
-            self.fgImage.fade(0)    # start hidden
 
 class HueCycle(ImageAnimBase):
     """
@@ -166,7 +173,7 @@ class SatCycle(ImageAnimBase):
     def step(self, chain=None):
         # speed control
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -248,7 +255,7 @@ class SlideAndZoom(ImageAnimBase):
     def step(self, chain=None):
         # speed control
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -353,7 +360,7 @@ class Dissolve(ImageAnimBase):
     def step(self):
         # speed control
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -427,7 +434,7 @@ class Roll(ImageAnimBase):
     def step(self, chain=None):
         # speed control
         if self.isNotNextStep() or self.rollDirection is None:
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -537,7 +544,7 @@ class Reveal(ImageAnimBase):
     def step(self, chain=None):
         # speed control
         if self.isNotNextStep(): 
-            if not self.init: self.refreshCanvas()
+            if not self.init: self.redrawLayer()
             return
 
         if self.init:
@@ -630,7 +637,7 @@ class Expand(ImageAnimBase):
 
     def step(self, chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -705,7 +712,7 @@ class Blur(ImageAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -762,7 +769,7 @@ class TheMatrix(ImageAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         imWidth,imHeight=self.fgImage.getSize()
@@ -854,7 +861,7 @@ class Collapse(ImageAnimBase):
 
     def step(self, chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
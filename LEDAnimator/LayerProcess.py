@@ -0,0 +1,279 @@
+"""
+LayerProcess.py
+
+Runs one animation layer (AnimInfo) in a separate process so that python heavy layers, like chain
+animations, are not held back by the GIL.
+
+The worker process renders the layer into an RGBA buffer, the size of the Panel, held in shared memory.
+The Animator process only has to draw the shared buffer on the Panel.
+
+Handshake:-
+
+The parent sends a frame request down a Pipe. The worker steps the layer, writes the shared buffer,
+stores the frame number in the shared frame counter then replies with the frame number. The parent
+only reads the buffer after the reply has arrived and the counter agrees with the frame it asked for.
+The worker does not touch the buffer again until the next request so the parent never draws a half
+written layer.
+
+The worker is created with fork() so it starts with a copy of the layer as it was when start() was
+called. Changes made to the layer in the parent afterwards are not seen by the worker, use reset() to
+reset the animation in the worker.
+
+Quality settings (see QualityGovernor.py) are module level so the worker has its own copies. The
+Animator passes the values its governor has chosen with each frame request and the worker applies them
+through the knobs it was given.
+
+usage:-
+
+    layer=LayerProcess(animInfo=animInfo,width=Panel.width,height=Panel.height)
+    layer.start()
+    layer.requestFrame(frameNumber,frameTime)
+    image=layer.getFrame(frameNumber)
+    Panel.DrawImage(0,0,image)
+    ...
+    layer.stop()
+
+"""
+
+import os
+import ctypes
+import traceback
+import multiprocessing
+import numpy as np
+import Scratch
+from UtilLib import pasteWithAlphaAt
+from Constants import BLEND_MODES
+from ExceptionErrors import *
+
+# requests sent to the worker
+FRAME="frame"
+RESET="reset"
+STOP="stop"
+
+def canFork():
+    """
+    worker processes need fork(). Windows does not have it.
+
+    :return bool: True if LayerProcess can be used
+    """
+    return hasattr(os,"fork")
+
+class LayerProcess(object):
+    """
+    Parameters:-
+
+    animInfo    the layer to render (required)
+    width       Panel width in pixels (required)
+    height      Panel height in pixels (required)
+    timeout     seconds to wait for the worker to render a frame
+    debug       passed on to the animation
+    knobs       QualityKnobs which affect the layer, set in the worker by requestFrame()
+    """
+
+    animInfo=None
+    width=None
+    height=None
+    timeout=5.0
+    debug=False
+    knobs=()
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.animInfo is not None,"LayerProcess() animInfo not set."
+        assert self.width is not None and self.height is not None,"LayerProcess() width and height must be set."
+        assert canFork(),"LayerProcess() needs os.fork() which is not available on this platform."
+
+        # shared between the processes
+        self.sharedBuffer=multiprocessing.RawArray(ctypes.c_uint8,self.width*self.height*4)
+        self.sharedFrame=multiprocessing.RawValue(ctypes.c_long,-1)
+        self.sharedPremultiplied=multiprocessing.RawValue(ctypes.c_bool,False)
+        self.sharedBlendMode=multiprocessing.RawValue(ctypes.c_int,0)       # index in BLEND_MODES
+
+        self.buffer=np.frombuffer(self.sharedBuffer,dtype=np.uint8).reshape(self.height,self.width,4)
+
+        self.conn=None
+        self.process=None
+        self.knobValues=None    # last values sent to the worker
+
+    def start(self):
+        """
+        forks the worker process
+
+        :return: Nothing
+        """
+        self.conn,childConn=multiprocessing.Pipe()
+        self.process=multiprocessing.Process(target=self._worker,args=(childConn,),name="LayerProcess "+str(self.animInfo.id))
+        self.process.daemon=True
+        self.process.start()
+        childConn.close()
+
+    def stop(self):
+        """
+        asks the worker to finish and waits for it. The worker is terminated if it does not respond.
+
+        :return: Nothing
+        """
+        if self.process is None: return
+
+        try:
+            self.conn.send((STOP,))
+        except (IOError,EOFError):
+            pass
+
+        self.process.join(self.timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+        self.conn.close()
+        self.process=None
+
+    def reset(self):
+        """
+        resets the layer in the worker process
+
+        :return: Nothing
+        """
+        self.conn.send((RESET,))
+        self._reply()
+
+    def requestFrame(self,frameNumber,frameTime,knobValues=None):
+        """
+        asks the worker to render the next frame. Returns immediately.
+
+        :param int frameNumber: increases by one each frame
+        :param float frameTime: timestamp for the frame, see AnimBase.now()
+        :param dict knobValues: knob name: value, see QualityGovernor.getValues(). None leaves them as they are
+        :return: Nothing
+        """
+        # only send the values when they change
+        if knobValues==self.knobValues:
+            knobValues=None
+        elif knobValues is not None:
+            self.knobValues=dict(knobValues)
+
+        self.conn.send((FRAME,frameNumber,frameTime,self.debug,knobValues))
+
+    def getFrame(self,frameNumber):
+        """
+        waits for the worker to finish the requested frame
+
+        :param int frameNumber: the frame passed to requestFrame()
+        :return: numpy RGBA image in shared memory. Valid until the next requestFrame()
+        """
+        reply=self._reply()
+
+        if reply<>frameNumber or self.sharedFrame.value<>frameNumber:
+            raise LayerProcessFailed("LayerProcess.getFrame() expected frame "+str(frameNumber)+" got "+str(reply)+
+                                     " buffer holds frame "+str(self.sharedFrame.value))
+        return self.buffer
+
+    def isPremultiplied(self):
+        """
+        :return bool: True if the buffer returned by getFrame() holds premultiplied colours, see UtilLib.alphaBlendInt()
+        """
+        return self.sharedPremultiplied.value
+
+    def getBlendMode(self):
+        """
+        :return str: how the buffer returned by getFrame() is combined with the layers below, see AnimBase.blendMode
+        """
+        return BLEND_MODES[self.sharedBlendMode.value]
+
+    def _reply(self):
+        """
+        waits for the worker to answer the last request
+
+        :return: the reply
+        """
+        if not self.conn.poll(self.timeout):
+            raise LayerProcessFailed("LayerProcess "+str(self.animInfo.id)+" timed out.")
+
+        try:
+            reply,error=self.conn.recv()
+        except EOFError:
+            raise LayerProcessFailed("LayerProcess "+str(self.animInfo.id)+" has stopped.")
+
+        if error is not None:
+            raise LayerProcessFailed("LayerProcess "+str(self.animInfo.id)+" failed:-\n"+error)
+
+        return reply
+
+    def _worker(self,conn):
+        """
+        runs in the worker process, answering requests until told to stop
+
+        :param conn: child end of the Pipe
+        :return: Nothing
+        """
+        self.conn.close()
+
+        while True:
+            try:
+                request=conn.recv()
+            except EOFError:
+                # parent has gone
+                return
+
+            command=request[0]
+
+            if command==STOP:
+                return
+
+            try:
+                if command==RESET:
+                    self.animInfo.reset()
+                    conn.send((None,None))
+                else:
+                    frameNumber,frameTime,debug,knobValues=request[1:]
+                    if knobValues is not None: self._applyKnobs(knobValues)
+                    self._renderFrame(frameNumber,frameTime,debug)
+                    conn.send((frameNumber,None))
+            except Exception:
+                conn.send((None,traceback.format_exc()))
+
+    def _applyKnobs(self,knobValues):
+        """
+        runs in the worker, sets the worker's copies of the quality settings
+
+        :param dict knobValues: knob name: value
+        :return: Nothing
+        """
+        for knob in self.knobs:
+            if knob.name in knobValues:
+                knob.apply(knobValues[knob.name])
+
+    def _renderFrame(self,frameNumber,frameTime,debug):
+        """
+        steps the layer and draws its output in the shared buffer
+
+        :param int frameNumber: frame being rendered
+        :param float frameTime: timestamp for the frame
+        :param bool debug: passed on to the animation
+        :return: Nothing
+        """
+        # the worker has its own copy of the Scratch arena
+        Scratch.reset()
+
+        draws=[]
+        self.animInfo.nextFrame(debug,frameTime,draws)
+
+        # premultiplied draws need the integer kernel, which leaves the buffer premultiplied
+        premultiplied=any(draw[4] for draw in draws)
+
+        if len(draws)==1 and draws[0][:2]==(0,0) and draws[0][2].shape==self.buffer.shape and draws[0][3]==1.0:
+            # the usual case, a single full size layerBuffer
+            self.buffer[:]=draws[0][2]
+        else:
+            # layers are transparent where nothing has been drawn
+            self.buffer.fill(0)
+            # the layer blendMode is used when the buffer is drawn on the Panel
+            for x,y,image,opacity,imagePremultiplied,blendMode in draws:
+                pasteWithAlphaAt(self.buffer,x,y,image,opacity,imagePremultiplied,premultiplied)
+
+        self.sharedPremultiplied.value=premultiplied
+        self.sharedBlendMode.value=BLEND_MODES.index(draws[0][5]) if draws else 0
+
+        self.sharedFrame.value=frameNumber
@@ -21,7 +21,9 @@ import math
 from scipy import ndimage
 from ExceptionErrors import *
 import ImageCache
+import Scratch
 from LEDAnimator.UtilLib import *
+from QualityGovernor import QualityKnob
 import cv2
 import random
 
@@ -38,8 +40,19 @@ except:
 
 
 
-# numpy images allow for fast(ish) image manipulation
+# resize quality, "high", "medium" or "low", see NumpyImage.interpolation()
+# lowered by the QualityGovernor when the Animator cannot keep up
+interpolationQuality="high"
+
+def setInterpolationQuality(quality):
+    global interpolationQuality
+    interpolationQuality=quality
+
+interpolationKnob=QualityKnob(name="image interpolation",levels=["high","medium","low"],
+                              apply=setInterpolationQuality,priority=1)
 
+
+# numpy images allow for fast(ish) image manipulation
 class NumpyImage():
     """
     Class to encapsulate image handling.
@@ -77,11 +90,32 @@ class NumpyImage():
     debug=False
     alpha=255           # used when NumbyImage is created from dimensions
     fillColor=None      # (r,g,b,a)
+    alphaClass=None     # cached by getAlphaClass(), cleared by alphaChanged()
 
 
     def getImageData(self):
         return self.out
 
+    def getAlphaClass(self):
+        """
+        classifies the out image alpha once, until it is changed, so pasteWithAlphaAt()
+        can copy or skip the image instead of blending it
+
+        :return int: ALPHA_OPAQUE, ALPHA_TRANSPARENT, ALPHA_MASK or ALPHA_GENERAL (see Constants.py)
+        """
+        if self.alphaClass is None:
+            self.alphaClass=classifyAlpha(self.out)
+        return self.alphaClass
+
+    def alphaChanged(self):
+        """
+        forgets the alpha class. Called by the methods which change the out image alpha. Code
+        which writes to the out image directly should call it.
+
+        :return: Nothing
+        """
+        self.alphaClass=None
+
     def resetImage(self):
         """
         used to undo ALL image editing changes to the final (out) image.
@@ -92,6 +126,7 @@ class NumpyImage():
         """
         self.out = self.rgba_cached.copy()
         self.height, self.width = self.out.shape[:2]
+        self.alphaChanged()
 
     def __init__(self,**kwargs):
         """
@@ -218,6 +253,7 @@ class NumpyImage():
         else:
             assert len(color) == 4, "Fill colour must have 4 channels got " + str(color)
             self.out[:,:]=[color]
+        self.alphaChanged()
 
     def fillAlpha(self,alpha=255):
         """
@@ -226,6 +262,7 @@ class NumpyImage():
         :return: nothing, self.out is moddified
         """
         self.out[...,ALPHA]=alpha
+        self.alphaChanged()
 
     def clearWindow(self,window):
         """
@@ -255,6 +292,7 @@ class NumpyImage():
             print "NumpyImage.filLWindow color=",color
             assert len(color) == 4, "Fill colour must have 4 channels got " + str(color)
             self.out[Y0:Y1, X0:X1] = [color]
+        self.alphaChanged()
 
     def fillWindowAlpha(self,window,alpha=255):
         """
@@ -267,6 +305,7 @@ class NumpyImage():
         """
         X0, Y0, X1, Y1 = self.getViewport(window)
         self.out[Y0:Y1, X0:X1,ALPHA ] = alpha
+        self.alphaChanged()
 
     # TODO needs testing
     def fillWindowRandomPalette(self,window,palette):
@@ -286,6 +325,7 @@ class NumpyImage():
             for y in range (Y1-Y0):
                 pixel=palette[random.randint[0,palLen]].getPixelColor()
                 self.out[y,x]=[pixel]
+        self.alphaChanged()
 
     def fillWindowRandom(self,window,alpha=255):
         """
@@ -299,6 +339,7 @@ class NumpyImage():
         tmp=np.random.randint(0,256,(h,w,3))
         self.out[y:y + h, x:x + w, :3 ] = tmp # np.random.randint(0, 256, (h, w, 3))
         self.out[y:y + h, x:x + w, ALPHA]=alpha
+        self.alphaChanged()
 
     def clear(self):
         """
@@ -311,9 +352,14 @@ class NumpyImage():
         """
         Determine which openCV interpolation method is best when enlarging or not.
 
+        The QualityGovernor may lower interpolationQuality to speed things up.
+
         :param boolean enlarging: True if enlarging
         :return: cv2 parameter for cv2.resize
         """
+        if interpolationQuality=="low": return cv2.INTER_NEAREST
+        if interpolationQuality=="medium": return cv2.INTER_LINEAR
+
         # choose a suitable interpolation alogrithm
         # LANCROS4 gives better results when enlarging but is SIGNIFICANTLY SLOWER then INTER_CUBIC
         return cv2.INTER_CUBIC if enlarging else cv2.INTER_AREA
@@ -473,6 +519,7 @@ class NumpyImage():
         if y<0 or y>=self.height: return
 
         self.out[y,x,ALPHA]=alpha
+        self.alphaChanged()
 
     def setPixel(self, x, y, color):
         """
@@ -489,6 +536,8 @@ class NumpyImage():
 
         if color is None: return
 
+        self.alphaChanged()
+
         if type(color) is tuple: #(rgba)
             # oddly this code occasionally throws ValueError: cannot convert float NaN to integer
             # but x,y,color and self.out[y,x] are all integers (as observed by printing the type()
@@ -535,11 +584,24 @@ class NumpyImage():
         y=f(y)
         self.out[y, x] = [np.random.random_integers(0, 255), np.random.random_integers(0, 255),
                           np.random.random_integers(0, 255), np.random.random_integers(0, 255)]
+        self.alphaChanged()
 
     ######################################################################
     #
     # Adjuster functions
 
+    def convertColor(self,image,code,name="hsv"):
+        """
+        cv2.cvtColor() into a Scratch array (see Scratch.py) rather than a new image
+
+        :param numpy ndarray image: image to convert
+        :param int code: cv2 conversion code e.g. PIXEL2HSV (see Constants.py)
+        :param str name: "hsv" or "rgb", two conversions used at once need different names
+        :return numpy ndarray: 3 channel image, use it before the next conversion
+        """
+        dst=Scratch.get("NumpyImage."+name,image.shape[:2]+(3,),np.uint8)
+        return cv2.cvtColor(image,code,dst)
+
     def adjustHue(self,amount=0):
         """
         adds amount to rgba_cached image
@@ -549,9 +611,9 @@ class NumpyImage():
         """
         assert type(amount) is int, self.classname+".adjustHue() Amount should be an int."
         if amount==0: return
-        tmp=cv2.cvtColor(self.rgba_cached,PIXEL2HSV)   # CONVERT2HLS - see Constants.py to HLS
+        tmp=self.convertColor(self.rgba_cached,PIXEL2HSV)   # CONVERT2HLS - see Constants.py to HLS
         tmp[:,:,HSV_H]=(tmp[:,:,HSV_H] + amount ) % 180
-        tmp2=cv2.cvtColor(tmp,HLS2PIXEL)      # back to RGB (or BGR - see Constants.py
+        tmp2=self.convertColor(tmp,HLS2PIXEL,"rgb")      # back to RGB (or BGR - see Constants.py
         self.out[:,:,:3]=tmp2
 
     def adjustSat(self,amount=0):
@@ -564,13 +626,13 @@ class NumpyImage():
         assert amount >= -255 and amount <= 255,  self.classname+".adjustSat() amount should be between -255 and +255"
         if amount == 0: return
 
-        tmp = cv2.cvtColor(self.out, PIXEL2HSV)  # see Constants.py
+        tmp = self.convertColor(self.out, PIXEL2HSV)  # see Constants.py
         if amount<0:
             tmp[:, :, HSV_S] = np.maximum(tmp[:, :, HSV_S] + amount, 0)
         elif amount>0:
             tmp[:, :, HSV_S] = np.minimum(tmp[:, :, HSV_S] + amount,255)
 
-        tmp = cv2.cvtColor(tmp, HSV2PIXEL)  # see Constants.py
+        tmp = self.convertColor(tmp, HSV2PIXEL, "rgb")  # see Constants.py
         self.out[:, :, :3] = tmp[:, :, :3]
 
     def adjustLum(self,amount=0):
@@ -584,12 +646,12 @@ class NumpyImage():
 
         if amount==0: return
 
-        tmp = cv2.cvtColor(self.out, PIXEL2HSV)  # see Constants.py
+        tmp = self.convertColor(self.out, PIXEL2HSV)  # see Constants.py
         if amount<0:
             tmp[:, :, HSV_V] = np.maximum(tmp[:, :, HSV_V] + amount, 0)
         elif amount>0:
             tmp[:, :, HSV_V] = np.minimum(tmp[:, :, HSV_V] + amount, 255)
-        tmp = cv2.cvtColor(tmp, HSV2PIXEL)  # see Constants.py
+        tmp = self.convertColor(tmp, HSV2PIXEL, "rgb")  # see Constants.py
         self.out[:, :, :3] = tmp[:, :, :3]
     ##########################################################################
     #
@@ -607,9 +669,9 @@ class NumpyImage():
         assert type(amount) is int,  self.classname+".setHue() amount should be an int."
         assert amount >=0 and amount <= 180,  self.classname+".setHue() amount should be between 0 and 360"
 
-        tmp = cv2.cvtColor(self.out, PIXEL2HSV)  # see Constants.py
+        tmp = self.convertColor(self.out, PIXEL2HSV)  # see Constants.py
         tmp[:, :, HSV_H] = np.minimum(amount, 180)
-        tmp = cv2.cvtColor(tmp, HSV2PIXEL)  # see Constants.py
+        tmp = self.convertColor(tmp, HSV2PIXEL, "rgb")  # see Constants.py
         self.out[:, :, :3] = tmp[:, :, :3]
 
     def setSat(self, amount):
@@ -624,9 +686,9 @@ class NumpyImage():
         assert type(amount) is int,  self.classname+".setSat() amount should be an int."
         assert amount >=0 and amount <= 255,  self.classname+".setSat() amount should be between 0 and 255"
 
-        tmp = cv2.cvtColor(self.out, PIXEL2HSV)  # see Constants.py
+        tmp = self.convertColor(self.out, PIXEL2HSV)  # see Constants.py
         tmp[:, :, HSV_S] = amount
-        tmp = cv2.cvtColor(tmp, HSV2PIXEL)  # see Constants.py
+        tmp = self.convertColor(tmp, HSV2PIXEL, "rgb")  # see Constants.py
         self.out[:, :, :3] = tmp[:, :, :3]
 
     def setValue(self,amount):
@@ -644,9 +706,9 @@ class NumpyImage():
 
         # openCV uses numer ranges 0-255
         # see Constants.py for PIXEL2HSV and HSV2PIXEL
-        tmp = cv2.cvtColor(self.out, PIXEL2HSV)
+        tmp = self.convertColor(self.out, PIXEL2HSV)
         tmp[:, :, HSV_V] = np.minimum(amount, 255)
-        tmp = cv2.cvtColor(tmp, HSV2PIXEL)
+        tmp = self.convertColor(tmp, HSV2PIXEL, "rgb")
         self.out[:, :, :3] = tmp[:, :, :3]
 
     def OFF_setBrightness(self,wanted):
@@ -682,6 +744,7 @@ class NumpyImage():
 
         # alter the alpha
         self.out[...,ALPHA]=int(factor*255)
+        self.alphaChanged()
 
     def OFFfade(self,percent):
         """
@@ -715,6 +778,7 @@ class NumpyImage():
 
         # alter the alpha
         self.out[...,ALPHA]=int(factor*255)
+        self.alphaChanged()
     ######################################################
     #
     # misc image manipulations
@@ -735,6 +799,7 @@ class NumpyImage():
             self.out=self.rgba_cached.copy()
         else:
             self.out=ndimage.gaussian_filter(self.rgba_cached,sigma=sigma)
+        self.alphaChanged()
 
     # TODO test blend
     def blend(self,blendWith,alpha=0):
@@ -748,6 +813,7 @@ class NumpyImage():
         :return Nothing: self.out is changed
         """
         self.out=alpha*self.out+(1-alpha)*blendWith
+        self.alphaChanged()
 
     def rotateAboutCenter(self, angle):
         """
@@ -900,6 +966,7 @@ class NumpyImage():
         X0, Y0, X1, Y1 = self.getViewport(window)
 
         self.out[Y0:Y1, X0:X1]=self.rgba_cached[Y0:Y1,X0:X1]
+        self.alphaChanged()
 
     def getViewport(self,window):
         """
@@ -972,6 +1039,7 @@ class NumpyImage():
         :return:
         """
         self.out = cv2.circle(self.out, center, radius, color, thickness, lineType)
+        self.alphaChanged()
 
     def cvLine(self,startPt,endPt,color,thickness=1,lineType=cv2.LINE_AA):
         """
@@ -985,6 +1053,7 @@ class NumpyImage():
         :return: self.out has the required line added
         """
         self.out=cv2.line(self.out,startPt,endPt,color,thickness,lineType)
+        self.alphaChanged()
 
     def cvRectangle(self,pt1,pt2,color,thickness=cv2.FILLED,lineType=cv2.LINE_AA):
         """
@@ -997,6 +1066,7 @@ class NumpyImage():
         :return: self.out has the shape drawn on it
         """
         self.out=cv2.rectangle(self.out,pt1,pt2,color,thickness,lineType)
+        self.alphaChanged()
 
     def cvPolyLines(self, pts, color, isClosed=False,thickness=1, lineType=cv2.LINE_AA):
         """
@@ -1012,6 +1082,7 @@ class NumpyImage():
         pts=np.array(pts,np.int32)
         pts=pts.reshape((-1,1,2))
         self.out = cv2.polylines(self.out,[pts],isClosed, color, thickness, lineType)
+        self.alphaChanged()
 
     def cvFilledPoly(self,pts,color,lineType=cv2.LINE_AA):
         """
@@ -1023,6 +1094,7 @@ class NumpyImage():
         """
         pts=np.array(pts,dtype=np.int32)
         self.out=cv2.fillPoly(self.out,[pts],color,lineType)
+        self.alphaChanged()
 
     def cvEllipse(self,center,axes,angle=0,startAngle=0,endAngle=360,color=(255,255,255,255),thickness=cv2.FILLED,
                   lineType=cv2.LINE_AA):
@@ -1041,6 +1113,7 @@ class NumpyImage():
         :return: self.out has an ellipse drawn on it
         """
         self.out=cv2.ellipse(self.out,center,axes,angle,startAngle,endAngle,color,thickness,lineType)
+        self.alphaChanged()
 
 
 
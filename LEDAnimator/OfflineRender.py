@@ -0,0 +1,555 @@
+#!/usr/bin/env python
+"""
+OfflineRender.py
+
+Renders a show script as fast as the CPU allows, without a matrix or simulator window.
+
+The show script is run unchanged. The Panel is made headless and, when the script calls Animator.run(),
+the Animator is handed to the OfflineRenderer instead. A SteppedClock moves the show on by exactly one
+frame per frame so the frames are the same as a show running in real time which never overruns.
+
+Frames are drawn in the Panel frameBuffer only. Panel.UpdateDisplay() is never called.
+
+Output:-
+
+*.avi, *.mp4    video, scaled up by --scale (LED panels are small)
+anything else   raw frames, 3 bytes per pixel (RGB) one frame after another. Play it with e.g.
+                ffplay -f rawvideo -pixel_format rgb24 -video_size 64x64 -framerate 100 show.rgb
+
+If no output is given the frames are rendered and thrown away, useful for timing a show.
+
+Sharding:-
+
+With --workers N (N>1) the show is split into N segments which are rendered at the same time by forked
+worker processes and then stitched together. How a worker gets to the start of its segment depends on --seek:-
+
+entry (the default) each layer is moved to the AnimSequence entry which is playing at the start of the segment
+                    and stepped, without drawing, from the start of that entry. This relies on every animation
+                    lasting its duration and starting afresh when it is reset(). Animations which carry state
+                    from one run to the next (palette position, random numbers) or finish early can be rendered
+                    differently.
+
+exact               every layer is stepped, without drawing, from the start of the show up to the start of
+                    the segment, just as a single process render would step it. The output is the same as a
+                    single process render but stepping still renders each animation's canvas, so the last
+                    worker does most of the show's work before its first frame. Little faster than one process.
+
+With --seek entry every worker also renders the first few frames (checkFrames) of the next segment. If they
+do not match what the next worker rendered that segment and all the ones after it are rendered again with
+exact seeking. This only catches differences which show up at the joins.
+
+--split animation (the default) moves each segment boundary to a nearby animation start, if there is one,
+so little stepping is needed before a segment with --seek entry. --split time uses equal length segments.
+
+Layers with their own updateFps are not stepped every frame so --seek entry cannot be used with them.
+
+The random number generators are seeded before rendering so every render of a show is the same.
+
+usage (from the folder containing LEDAnimator):-
+
+    python -m LEDAnimator.OfflineRender Examples/TextDemo.py --seconds 60 --output TextDemo.avi --scale 8
+
+NOTE: Constants.py finds the Fonts folder from the current working directory so the rest of LEDAnimator
+is only imported once we have moved to the show script's folder.
+
+"""
+
+import os
+import sys
+import math
+import random
+import shutil
+import tempfile
+import argparse
+import multiprocessing
+import numpy as np
+import cv2
+
+VIDEO_CODECS={".avi":"DIVX",".mp4":"mp4v"}
+
+
+class OfflineRenderFinished(BaseException):
+    """
+    raised when the render is complete to stop the rest of the show script running.
+    Not an Exception so that show scripts which catch Exception around A.run() don't report it.
+    """
+    pass
+
+
+class RawWriter(object):
+    """
+    writes frames as raw RGB bytes
+    """
+
+    def __init__(self,fname):
+        from LEDAnimator.Constants import RGB_R,RGB_G,RGB_B
+
+        self.channels=[RGB_R,RGB_G,RGB_B]
+        self.file=open(fname,"wb")
+
+    def write(self,frame):
+        self.file.write(np.ascontiguousarray(frame[:,:,self.channels]).tostring())
+
+    def close(self):
+        self.file.close()
+
+
+class VideoWriter(object):
+    """
+    writes frames to a video file using opencv
+    """
+
+    def __init__(self,fname,fps,width,height,scale=1):
+        from LEDAnimator.Constants import RGB_R,RGB_G,RGB_B
+
+        self.channels=[RGB_B,RGB_G,RGB_R]
+        self.scale=scale
+        codec=VIDEO_CODECS[os.path.splitext(fname)[1].lower()]
+        self.video=cv2.VideoWriter(fname,cv2.VideoWriter_fourcc(*codec),fps,(width*scale,height*scale))
+
+        if not self.video.isOpened():
+            raise IOError("OfflineRender could not open video file "+fname)
+
+    def write(self,frame):
+        bgr=np.ascontiguousarray(frame[:,:,self.channels])
+        if self.scale>1:
+            bgr=cv2.resize(bgr,(0,0),fx=self.scale,fy=self.scale,interpolation=cv2.INTER_NEAREST)
+        self.video.write(bgr)
+
+    def close(self):
+        self.video.release()
+
+
+def stitchSegment(fname,writer,width,height):
+    """
+    copies the frames from a raw segment file to the output
+
+    :param str fname: raw RGB frame file written by a worker
+    :param writer: RawWriter or VideoWriter
+    :param int width: frame width
+    :param int height: frame height
+    :return: Nothing
+    """
+    from LEDAnimator.Constants import RGB_R,RGB_G,RGB_B
+
+    frameSize=width*height*3
+    frame=np.zeros((height,width,4),dtype=np.uint8)
+
+    with open(fname,"rb") as segment:
+        while True:
+            data=segment.read(frameSize)
+            if len(data)<frameSize: break
+
+            # back to pixel order for the writer
+            rgb=np.frombuffer(data,dtype=np.uint8).reshape(height,width,3)
+            frame[:,:,RGB_R]=rgb[:,:,0]
+            frame[:,:,RGB_G]=rgb[:,:,1]
+            frame[:,:,RGB_B]=rgb[:,:,2]
+            writer.write(frame)
+
+def openWriter(fname,fps,width,height,scale=1):
+    """
+    :param str fname: output file name, None for no output
+    :return: RawWriter, VideoWriter or None
+    """
+    if fname is None: return None
+
+    if os.path.splitext(fname)[1].lower() in VIDEO_CODECS:
+        return VideoWriter(fname,fps,width,height,scale)
+
+    return RawWriter(fname)
+
+
+class OfflineRenderer(object):
+    """
+    Parameters:-
+
+    seconds     length of show to render
+    output      file name, see above. None renders without saving
+    scale       video output only, each LED becomes scale x scale pixels
+    """
+
+    seconds=10
+    output=None
+    scale=1
+    workers=1       # worker processes, see Sharding above
+    split="animation"   # segment boundaries, "animation" or "time"
+    seek="entry"    # how workers reach the start of their segment, "entry" or "exact"
+    checkFrames=5   # frames compared where segments join, seek="entry" only
+    fps=None        # taken from the Animator
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.seek in ("exact","entry"),"OfflineRenderer() seek should be 'exact' or 'entry' got "+str(self.seek)
+
+        self.frames=0
+        self.elapsed=0.0
+
+    def render(self,animator):
+        """
+        renders the show, called by Animator.run()
+
+        :param Animator animator: the show
+        :return: Nothing, OfflineRenderFinished is raised when done
+        """
+        import LEDAnimator.Panel as Panel
+        from LEDAnimator.Clock import SteppedClock
+        from LEDAnimator.UtilLib import monotonic
+
+        self.fps=animator.fps
+        clock=SteppedClock(fps=animator.fps)
+        animator.setClock(clock)
+
+        totalFrames=int(round(self.seconds*animator.fps))
+
+        # so that every render of a show, sharded or not, is the same
+        random.seed(0)
+        np.random.seed(0)
+
+        if self.workers>1 and self.canShard(animator):
+            print "OfflineRender rendering %d frames (%.1fs at %d fps) using %d workers, %s seeking" % \
+                  (totalFrames,self.seconds,animator.fps,self.workers,self.seek)
+            sys.stdout.flush()
+
+            start=monotonic()
+            self.renderSharded(animator,totalFrames)
+        else:
+            writer=openWriter(self.output,animator.fps,Panel.width,Panel.height,self.scale)
+
+            print "OfflineRender rendering %d frames (%.1fs at %d fps)" % (totalFrames,self.seconds,animator.fps)
+            sys.stdout.flush()
+
+            start=monotonic()
+            try:
+                self.renderFrames(animator,clock,0,totalFrames,writer)
+            finally:
+                if writer is not None: writer.close()
+
+        self.frames=totalFrames
+        self.elapsed=monotonic()-start
+        print self.report()
+
+        raise OfflineRenderFinished
+
+    def renderFrames(self,animator,clock,first,last,writer):
+        """
+        renders frames first to last-1
+
+        :param Animator animator: the show
+        :param SteppedClock clock: the animator's clock, on frame first
+        :param int first: first frame
+        :param int last: frame after the last one
+        :param writer: RawWriter, VideoWriter or None
+        :return: Nothing
+        """
+        import LEDAnimator.Panel as Panel
+
+        interval=clock.interval
+        for frame in xrange(first,last):
+            animator.renderFrame(clock.now(),interval,frame)
+            if writer is not None: writer.write(Panel.frameBuffer.getImageData())
+            clock.frameDone()
+
+    def canShard(self,animator):
+        """
+        :param Animator animator: the show
+        :return bool: True if the show can be split between worker processes
+        """
+        if not hasattr(os,"fork"):
+            print "OfflineRender sharding needs os.fork(), using one process."
+            return False
+
+        if self.seek=="entry":
+            for animInfo in animator.animations:
+                if animInfo.updateFps is not None:
+                    print "OfflineRender layers with updateFps cannot be sought by entry, using one process."
+                    return False
+
+        return True
+
+    def layerTimeline(self,animInfo,totalFrames):
+        """
+        works out the frame on which each AnimSequence entry of a layer starts, assuming every
+        animation lasts exactly its duration. See AnimBase.nextFrame()
+
+        :param AnimInfo animInfo: the layer
+        :param int totalFrames: frames in the render
+        :return list: (start frame,entry index) for every entry started before totalFrames
+        """
+        from LEDAnimator.Clock import SteppedClock
+
+        seq=animInfo.animSeq
+        clock=SteppedClock(fps=self.fps)
+
+        def now(frame):
+            # exactly as the clock does it, rounding errors can move an expiry by a frame
+            clock.frame=frame
+            return clock.now()
+
+        timeline=[]
+        entry=seq.curAnim
+        start=0
+        while start<totalFrames:
+            timeline.append((start,entry))
+
+            # the animation ends on the first frame at which its duration has expired
+            duration=seq.animList[entry].duration
+            end=start+max(0,int(math.ceil(duration*self.fps))-1)
+            while now(end)-now(start)<duration: end+=1
+
+            # and the next one is reset on the following frame
+            start=end+1
+            entry=(entry+1) % seq.listLen
+
+        return timeline
+
+    def planSegments(self,animator,totalFrames):
+        """
+        splits the render into segments, one per worker
+
+        :param Animator animator: the show
+        :param int totalFrames: frames in the render
+        :return list: (first frame,frame after last) for each segment
+        """
+        workers=min(self.workers,totalFrames)
+        ideal=[int(round(n*totalFrames/float(workers))) for n in range(workers+1)]
+
+        if self.split=="animation":
+            starts=set()
+            for animInfo in animator.animations:
+                starts.update(frame for frame,entry in self.layerTimeline(animInfo,totalFrames))
+
+            # move each boundary to the nearest animation start unless that would unbalance the workers
+            starts=sorted(starts)
+            tolerance=totalFrames/(4*workers)
+            for n in range(1,workers):
+                nearest=min(starts,key=lambda frame: abs(frame-ideal[n]))
+                if abs(nearest-ideal[n])<=tolerance: ideal[n]=nearest
+
+        boundaries=sorted(set(ideal))
+        return zip(boundaries[:-1],boundaries[1:])
+
+    def seekLayer(self,animInfo,clock,frame,totalFrames):
+        """
+        puts a layer in the state it would have at the start of frame, by starting the AnimSequence
+        entry playing at that frame then stepping it without drawing
+
+        :param AnimInfo animInfo: the layer
+        :param SteppedClock clock: the animator's clock
+        :param int frame: frame to seek to
+        :param int totalFrames: frames in the render
+        :return: Nothing
+        """
+        start,entry=[item for item in self.layerTimeline(animInfo,totalFrames) if item[0]<=frame][-1]
+
+        animInfo.animSeq.curAnim=entry
+        animInfo.animSeq.animList[entry].durationStart=None
+        animInfo.animFunc=None
+
+        for n in xrange(start,frame):
+            clock.frame=n
+            animInfo.nextFrame(False,clock.now(),[])
+
+    def renderSegment(self,animator,first,last,totalFrames,fname,exact=False,randomState=None):
+        """
+        runs in a worker process, renders one segment to a raw frame file. When seeking by entry, unless
+        the segment is the last one, the first checkFrames frames of the next segment are also rendered,
+        to fname+".check", so the parent can see if the segments join up.
+
+        :param Animator animator: the show, as it was before the render started
+        :param int first: first frame of the segment
+        :param int last: frame after the last one
+        :param int totalFrames: frames in the render
+        :param str fname: raw output file
+        :param bool exact: step every layer from frame 0 instead of seeking, see Sharding above
+        :param tuple randomState: random.getstate() in the parent
+        :return: Nothing
+        """
+        from LEDAnimator.Clock import SteppedClock
+
+        # multiprocessing reseeds random in the worker, numpy is left alone
+        if randomState is not None: random.setstate(randomState)
+
+        clock=SteppedClock(fps=self.fps)
+        animator.setClock(clock)
+
+        if exact:
+            # exactly what a single process render does, without drawing anything
+            for n in xrange(first):
+                clock.frame=n
+                for animInfo in animator.animations:
+                    animInfo.nextFrame(False,clock.now(),[])
+        elif first>0:
+            for animInfo in animator.animations:
+                self.seekLayer(animInfo,clock,first,totalFrames)
+
+        clock.frame=first
+        writer=RawWriter(fname)
+        try:
+            self.renderFrames(animator,clock,first,last,writer)
+        finally:
+            writer.close()
+
+        if not exact and last<totalFrames:
+            writer=RawWriter(fname+".check")
+            try:
+                self.renderFrames(animator,clock,last,min(last+self.checkFrames,totalFrames),writer)
+            finally:
+                writer.close()
+
+    def runWorkers(self,animator,segments,totalFrames,folder,exact=False):
+        """
+        renders segments in parallel, one worker process each
+
+        :param Animator animator: the show
+        :param list segments: (segment number,first frame,frame after last) for each segment
+        :param int totalFrames: frames in the render
+        :param str folder: where the segment files are written
+        :param bool exact: see renderSegment()
+        :return: Nothing
+        """
+        randomState=random.getstate()
+
+        workers=[]
+        for n,first,last in segments:
+            fname=os.path.join(folder,"segment%d.rgb" % n)
+            print "OfflineRender worker %d frames %d to %d%s" % (n,first,last-1," (exact)" if exact else "")
+            sys.stdout.flush()
+
+            worker=multiprocessing.Process(target=self.renderSegment,
+                                           args=(animator,first,last,totalFrames,fname,exact,randomState))
+            worker.start()
+            workers.append(worker)
+
+        for worker in workers:
+            worker.join()
+
+        for worker in workers:
+            if worker.exitcode<>0:
+                raise RuntimeError("OfflineRender worker failed with exit code "+str(worker.exitcode))
+
+    def renderSharded(self,animator,totalFrames):
+        """
+        renders the segments in worker processes then stitches the output together.
+
+        When seeking by entry, segments which do not join up with the one before are rendered again
+        exactly. See Sharding above.
+
+        :param Animator animator: the show
+        :param int totalFrames: frames in the render
+        :return: Nothing
+        """
+        import LEDAnimator.Panel as Panel
+
+        segments=[(n,first,last) for n,(first,last) in enumerate(self.planSegments(animator,totalFrames))]
+        folder=tempfile.mkdtemp(prefix="OfflineRender")
+        frameSize=Panel.width*Panel.height*3
+
+        def segmentFile(n):
+            return os.path.join(folder,"segment%d.rgb" % n)
+
+        def readFrames(fname,frames):
+            with open(fname,"rb") as f:
+                return f.read(frames*frameSize)
+
+        exact=self.seek=="exact"
+
+        try:
+            self.runWorkers(animator,segments,totalFrames,folder,exact)
+
+            # everything from the first segment which does not follow on from the one before is rendered again
+            if not exact:
+                for n in range(1,len(segments)):
+                    frames=min(self.checkFrames,segments[n][2]-segments[n][1])
+                    if readFrames(segmentFile(n-1)+".check",frames)<>readFrames(segmentFile(n),frames):
+                        print "OfflineRender segment %d does not join up with segment %d, rendering again" % (n,n-1)
+                        self.runWorkers(animator,segments[n:],totalFrames,folder,exact=True)
+                        break
+
+            if self.output is None: return
+
+            writer=openWriter(self.output,self.fps,Panel.width,Panel.height,self.scale)
+            try:
+                for n,first,last in segments:
+                    stitchSegment(segmentFile(n),writer,Panel.width,Panel.height)
+            finally:
+                writer.close()
+        finally:
+            shutil.rmtree(folder,ignore_errors=True)
+
+    def getFps(self):
+        """
+        :return float: frames rendered per second of CPU time
+        """
+        return self.frames/self.elapsed if self.elapsed>0 else 0.0
+
+    def report(self):
+        """
+        :return str: printable summary of the last render
+        """
+        showSeconds=float(self.frames)/self.fps if self.fps else 0.0
+        return "OfflineRender %d frames in %.2fs, %.1f frames/sec, %.1fx real time" % \
+               (self.frames,self.elapsed,self.getFps(),showSeconds/self.elapsed if self.elapsed>0 else 0.0)
+
+    def renderScript(self,script):
+        """
+        runs a show script, rendering the first Animator it runs
+
+        :param str script: path to the show script
+        :return: Nothing
+        """
+        script=os.path.abspath(script)
+        folder=os.path.dirname(script)
+
+        # LEDAnimator must still be found after changing folder. When run with python -m the
+        # package may have been imported using a relative path
+        import LEDAnimator
+        LEDAnimator.__path__=[os.path.abspath(path) for path in LEDAnimator.__path__]
+        sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        # the show scripts expect to be run from their own folder
+        os.chdir(folder)
+        sys.path.insert(0,folder)
+        sys.argv=[script]
+
+        import LEDAnimator.Panel as Panel
+        from LEDAnimator.Animator import Animator
+
+        Panel.headless=True
+        Animator.renderer=self.render
+
+        try:
+            execfile(script,{"__name__":"__main__","__file__":script})
+        except OfflineRenderFinished:
+            return
+        except SystemExit:
+            pass
+        finally:
+            Animator.renderer=None
+
+        print "OfflineRender the show script did not call Animator.run()"
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Render a show script faster than real time.")
+    parser.add_argument("script",help="show script to render")
+    parser.add_argument("-s","--seconds",type=float,default=10,help="seconds of show to render (default 10)")
+    parser.add_argument("-o","--output",default=None,help="video (.avi, .mp4) or raw RGB output file")
+    parser.add_argument("--scale",type=int,default=1,help="video output scale factor (default 1)")
+    parser.add_argument("-w","--workers",type=int,default=1,help="worker processes (default 1)")
+    parser.add_argument("--split",choices=["animation","time"],default="animation",
+                        help="segment boundaries at animation starts or equal times (default animation)")
+    parser.add_argument("--seek",choices=["entry","exact"],default="entry",
+                        help="workers step from the start of the playing animation or of the show (default entry)")
+    args=parser.parse_args(argv)
+
+    output=os.path.abspath(args.output) if args.output is not None else None
+
+    renderer=OfflineRenderer(seconds=args.seconds,output=output,scale=args.scale,workers=args.workers,
+                             split=args.split,seek=args.seek)
+    renderer.renderScript(args.script)
+
+if __name__=="__main__":
+    main()
@@ -14,6 +14,7 @@ from LEDAnimator.Colors import *
 from LEDAnimator.Constants import *
 from LEDAnimator.Palette import *
 from LEDAnimator.UtilLib import *
+from LEDAnimator.QualityGovernor import QualityKnob
 
 import cv2
 
@@ -35,6 +36,15 @@ import os
 
 WHITE=White.getPixelColor() # foreground RGBA 100% alpha
 
+# turned off by the QualityGovernor when the Animator cannot keep up
+antiAliasing=True
+
+def setAntiAliasing(enabled):
+    global antiAliasing
+    antiAliasing=enabled
+
+antiAliasKnob=QualityKnob(name="text anti-aliasing",levels=[True,False],apply=setAntiAliasing,priority=1)
+
 class Font():
 
     fontFace=None       # use default font
@@ -168,7 +178,7 @@ class Font():
         render=ImageDraw.Draw(pil_im)
 
         # turn of anit-aliasing?
-        if lineType!=LINE_AA:
+        if lineType!=LINE_AA or not antiAliasing:
             render.fontmode="1"
 
         if isinstance(fgColor,Palette):
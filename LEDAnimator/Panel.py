@@ -12,13 +12,33 @@ which the Hzeller drivers don't.
 
 NOTE: sys.stdout.flush is used to prevent startuop messages being delayed
 
+Pipelined output
+
+By default UpdateDisplay() converts and ships the frameBuffer to the matrix before returning so nothing else
+can be drawn until the matrix has accepted the frame. StartPipeline() starts an output thread which does the
+colour correction, PIL conversion and SwapOnVSync instead. UpdateDisplay() then just hands the finished
+frameBuffer over and gives the caller another buffer to draw the next frame into.
+
+Only one frame ever waits for the output thread. If the output thread is still busy when the next frame
+arrives the waiting frame is replaced by the newer one (latest frame wins) so the display never lags behind
+the animations. Frames replaced this way are counted as dropped.
+
+The frameBuffer handed back by UpdateDisplay() contains an old frame so the caller must redraw all of it
+(the Animator calls Clear() at the start of every frame).
+
+Headless
+
+If headless is set True before init() is called no matrix or simulator window is created. Frames are
+only drawn in the frameBuffer, which is how OfflineRender.py renders shows.
 
 """
 
 import LEDAnimator.NumpyImage as ni
 from LEDAnimator.ExceptionErrors import *
-from LEDAnimator.UtilLib import pasteWithAlphaAt
+from LEDAnimator.UtilLib import pasteWithAlphaAt,monotonic
 from LEDAnimator.Colors import *
+import numpy as np
+import threading
 import sys
 
 ##############################################################
@@ -39,8 +59,17 @@ if platform.system()=="Windows":
     from Simulator.RGBMatrixOptions import RGBMatrixOptions
     simulating=True
 else:
-    from rgbmatrix import RGBMatrix,RGBMatrixOptions
-    simulating=False
+    try:
+        from rgbmatrix import RGBMatrix,RGBMatrixOptions
+        simulating=False
+    except ImportError:
+        # not a Pi, e.g. rendering shows offline on a Linux PC
+        print "rgbmatrix not found, using the simulator"
+        sys.stdout.flush()
+
+        from Simulator.RGBMatrix import RGBMatrix
+        from Simulator.RGBMatrixOptions import RGBMatrixOptions
+        simulating=True
 
 
 ###############################################################
@@ -91,10 +120,24 @@ Options.drop_privileges = False
 
 matrix = None                           # the RGB matrix
 canvas = None                           # not used by the simulator
+_shippedRects=None                      # rectangles sent to the matrix with the last frame, None for all of it
 frameBuffer=None                        # NumpyImage used to represent the current display
 panelBgColor=Black.getPixelColor()     # panel background color opaque Black
 width=0                                 # panel width in pixels
 height=0                                # panel height in pixels
+headless=False                          # True to render into the frameBuffer without a matrix or simulator
+brightness=100                          # percent, see SetBrightness()
+integerBlend=False                      # True to blend images with UtilLib.alphaBlendInt() instead of floats
+
+# pipelined output - see StartPipeline()
+pipelined=False                         # True whilst the output thread is running
+pipeBuffers=3                           # frame buffers in use by the pipeline: drawing, waiting and shipping
+_pipeCondition=threading.Condition()    # guards the variables below
+_pendingFrame=None                      # frame waiting for the output thread
+_pendingRects=None                      # rectangles changed since the last frame shipped, None for all of it
+_freeBuffers=[]                         # frame buffers ready to be drawn into
+_outputThread=None
+_pipeStats=None
 
 ###################################################################
 # some classes to help PyCharm know what parameters exist
@@ -102,6 +145,16 @@ height=0                                # panel height in pixels
 # used for parameter collection and passing
 ###################################################################
 
+class HeadlessMatrix(object):
+    """
+    stands in for the RGBMatrix when headless
+    """
+    def SetImage(self,img):
+        pass
+
+    def IsRunning(self):
+        return True
+
 class imageOptions(object):
     """
     used to gather image options from kwargs
@@ -131,12 +184,19 @@ def init(**kwargs):
         # only accept valid RGBMatrix options
         if getattr(Options,key,None) is not None: setattr(Options,key,value)
 
-    #create the matrix object
-    matrix=RGBMatrix(options=Options)
-
     height=Options.rows*Options.parallel
     width=Options.rows*Options.chain_length
 
+    if headless:
+        print "Panel.init() headless, frames will not be displayed"
+        matrix=HeadlessMatrix()
+        simulating=True
+        frameBuffer=ni.NumpyImage(width=width,height=height)
+        return
+
+    #create the matrix object
+    matrix=RGBMatrix(options=Options)
+
     print "Panel.init() creating frameBuffer width %d,height %d\n"% (width,height)
     sys.stdout.flush()
 
@@ -152,32 +212,207 @@ def CheckInit():
     if matrix is None:
         raise PanelInitNotCalled
 
-def UpdateDisplay():
+def UpdateDisplay(rects=None):
     """
     copies the frameBuffer to the RGBMatrix and refreshes the visible display
+
+    If the pipeline is running the frameBuffer is handed to the output thread and a free
+    buffer takes its place - see StartPipeline()
+
+    :param list rects: (x0,y0,x1,y1) rectangles which have changed since the last call, None if the
+                       whole frameBuffer may have changed. See DirtyRects.py
     :return: nothing
     """
-    global matrix,simulating,canvas
+    global frameBuffer,_pendingFrame,_pendingRects
 
     CheckInit()
 
-    # simulator and physical matrices behave differently here
-    img=frameBuffer.getImageData()
+    if not pipelined:
+        _shipFrame(frameBuffer.getImageData(),rects)
+        return
+
+    start=monotonic()
+
+    with _pipeCondition:
+        if _pendingFrame is not None:
+            # the output thread has not picked up the last frame - latest frame wins
+            _freeBuffers.append(_pendingFrame)
+            _pipeStats["dropped"]+=1
 
+            # the changes in the dropped frame have not been sent either
+            rects=_pendingRects+rects if rects is not None and _pendingRects is not None else None
+
+        _pendingFrame=frameBuffer
+        _pendingRects=rects
+        frameBuffer=_freeBuffers.pop()
+        _pipeStats["queued"]+=1
+        _pipeStats["handoffTime"]+=monotonic()-start
+        _pipeCondition.notify()
+
+def _colorCorrect(img):
+    """
+    applies the red/green/blue adjustments to a copy of the image
+
+    :param img: numpy RGBA image in pixel order
+    :return: numpy RGB image (uint8) in pixel order
+    """
+    adjust=np.ones(3,np.float32)
+    adjust[RGB_R]=redAdjust
+    adjust[RGB_G]=greenAdjust
+    adjust[RGB_B]=blueAdjust
+
+    return (img[:,:,0:3]*adjust).astype(np.uint8)
+
+def _shipFrame(img,rects=None):
+    """
+    sends an image to the simulator or physical matrix
+
+    The matrix has two canvases which are swapped each frame so the one being drawn on holds the
+    frame before last. Only the rectangles which changed in the last two frames are sent to it.
+
+    :param img: numpy RGBA image in pixel order
+    :param list rects: (x0,y0,x1,y1) rectangles changed since the last frame, None for all of it
+    :return: nothing
+    """
+    global canvas,_shippedRects
+
+    # simulator and physical matrices behave differently here
     if simulating:
+        # the matrix dims the LEDs itself, the simulator has to be shown a dimmer image
+        if brightness<100:
+            img=img.copy()
+            img[:,:,0:3]=(img[:,:,0:3]*(brightness/100.0)).astype(np.uint8)
+
         # no matrix refresh needed here
         matrix.SetImage(img)
     else:
-        img[RGB_R]*=redAdjust
-        img[RGB_G]*=greenAdjust
-        img[RGB_B]*=blueAdjust
-
         # note Constants.RGB_R & RGB_B will need to be set RGB_R=0 and RGB_B=2
         # to ensure RGB colours are in the correct order
-        canvas.SetImage(Image.fromarray(img).convert("RGB"))
+        if rects is None or _shippedRects is None:
+            canvas.SetImage(Image.fromarray(_colorCorrect(img)))
+        else:
+            for x0,y0,x1,y1 in rects+_shippedRects:
+                canvas.SetImage(Image.fromarray(_colorCorrect(img[y0:y1,x0:x1])),x0,y0)
+        _shippedRects=rects
         canvas=matrix.SwapOnVSync(canvas)
 
-def DrawImage(x,y,image):
+def _outputLoop():
+    """
+    output thread - ships each frame handed over by UpdateDisplay()
+    runs until StopPipeline() is called and the last frame has been shipped
+    """
+    global _pendingFrame,_pendingRects
+
+    while True:
+        with _pipeCondition:
+            while _pendingFrame is None and pipelined:
+                _pipeCondition.wait()
+
+            if _pendingFrame is None:
+                return
+
+            buffer=_pendingFrame
+            rects=_pendingRects
+            _pendingFrame=None
+
+        start=monotonic()
+        _shipFrame(buffer.getImageData(),rects)
+        elapsed=monotonic()-start
+
+        with _pipeCondition:
+            _freeBuffers.append(buffer)
+            _pipeStats["shipped"]+=1
+            _pipeStats["outputTime"]+=elapsed
+
+def StartPipeline():
+    """
+    starts the output thread so that the next frame can be drawn whilst the
+    previous one is being sent to the matrix.
+
+    :return: nothing
+    """
+    global pipelined,_outputThread,_pendingFrame,_pendingRects,_freeBuffers,_pipeStats
+
+    CheckInit()
+
+    if pipelined: return
+
+    assert pipeBuffers>=3,"Panel.StartPipeline() needs at least 3 frame buffers."
+
+    _pendingFrame=None
+    _pendingRects=None
+    _freeBuffers=[ni.NumpyImage(width=width,height=height) for _ in range(pipeBuffers-1)]
+    _pipeStats={"queued":0,"shipped":0,"dropped":0,"handoffTime":0.0,"outputTime":0.0}
+
+    pipelined=True
+    _outputThread=threading.Thread(target=_outputLoop,name="PanelOutput")
+    _outputThread.daemon=True
+    _outputThread.start()
+
+def StopPipeline():
+    """
+    waits for the output thread to ship the last frame then stops it.
+    UpdateDisplay() reverts to shipping frames itself.
+
+    :return: nothing
+    """
+    global pipelined,_outputThread
+
+    if not pipelined: return
+
+    with _pipeCondition:
+        pipelined=False
+        _pipeCondition.notify()
+
+    _outputThread.join()
+    _outputThread=None
+
+def GetPipelineStats(interval=None):
+    """
+    returns the output pipeline counters
+
+    queued      frames handed to the output thread
+    shipped     frames sent to the matrix
+    dropped     frames replaced by a newer frame before they were shipped
+    handoffTime mean seconds UpdateDisplay() took to hand a frame over
+    outputTime  mean seconds the output thread took to ship a frame
+
+    If the frame interval is given, recovered is the percentage of each frame interval
+    no longer spent waiting for output i.e. (outputTime-handoffTime)/interval*100
+
+    :param float interval: seconds per frame (1/fps) or None
+    :return dict: counters or None if the pipeline has never been started
+    """
+    if _pipeStats is None: return None
+
+    with _pipeCondition:
+        stats=dict(_pipeStats)
+
+    stats["handoffTime"]=stats["handoffTime"]/stats["queued"] if stats["queued"] else 0.0
+    stats["outputTime"]=stats["outputTime"]/stats["shipped"] if stats["shipped"] else 0.0
+
+    if interval:
+        stats["recovered"]=100.0*(stats["outputTime"]-stats["handoffTime"])/interval
+
+    return stats
+
+def ReportPipeline(interval=None):
+    """
+    :param float interval: seconds per frame (1/fps) or None
+    :return str: printable summary of GetPipelineStats()
+    """
+    stats=GetPipelineStats(interval)
+    if stats is None: return "Panel pipeline not started"
+
+    report="Panel pipeline queued=%d shipped=%d dropped=%d handoff=%.3fms output=%.3fms" % \
+           (stats["queued"],stats["shipped"],stats["dropped"],stats["handoffTime"]*1000,stats["outputTime"]*1000)
+
+    if "recovered" in stats:
+        report+=" recovered=%.1f%% of frame budget" % stats["recovered"]
+
+    return report
+
+def DrawImage(x,y,image,opacity=1.0,premultiplied=False,blendMode="over"):
     """
     Overwrites whatever is on the matrix in the region of the image.
 
@@ -186,6 +421,9 @@ def DrawImage(x,y,image):
     :param float x:   top left coord of image
     :param float y:   top left coord of image
     :param image: numpy image (ndarray) to draw
+    :param float opacity: 0.0->1.0 multiplies the image alpha
+    :param bool premultiplied: True if the image colours are premultiplied by alpha, see UtilLib.alphaBlendInt()
+    :param str blendMode: one of BLEND_MODES (see Constants.py), see UtilLib.blendModeInt()
     :return None: frameBuffer is updated
     """
 
@@ -194,7 +432,7 @@ def DrawImage(x,y,image):
     CheckInit()
 
     # paste with Alpha converts X/y to nearest pixel
-    pasteWithAlphaAt(frameBuffer.out,x,y,image)
+    pasteWithAlphaAt(frameBuffer.out,x,y,image,opacity,premultiplied,integerBlend,blendMode=blendMode)
 
 
 def DrawPixel(x,y,color):
@@ -250,13 +488,19 @@ def GetPixel(x,y):
     (a,b,c,d)=frameBuffer.getPixel(x, y)
     return (a,b,c,d)
 
-def Clear():
+def Clear(rect=None):
     """
     Fill the frameBuffer with the current background color.
+    :param tuple rect: (x0,y0,x1,y1) to clear only that rectangle, None for all of it
     :return: Nothing
     """
     global  panelBgColor
-    frameBuffer.fill(panelBgColor)
+    if rect is None:
+        frameBuffer.fill(panelBgColor)
+        return
+
+    x0,y0,x1,y1=rect
+    frameBuffer.out[y0:y1,x0:x1]=[panelBgColor]
 
 def Fill(color):
     """
@@ -278,6 +522,21 @@ def SetBgColor(bg=Black.getPixelColor()):
 
     panelBgColor=bg
 
+def SetBrightness(percent):
+    """
+    changes the brightness of the whole display, takes effect from the next frame shipped
+
+    :param int percent: 0 to 100
+    :return: nothing
+    """
+    global brightness
+
+    assert 0<=percent<=100,"Panel.SetBrightness() percent should be 0 to 100 got "+str(percent)
+
+    brightness=percent
+    if not simulating and matrix is not None:
+        matrix.brightness=percent
+
 def isRunning():
     """
     The simulated RGBMatrix uses a background thread to display the frameBuffer.
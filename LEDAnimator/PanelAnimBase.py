@@ -23,7 +23,7 @@ class PanelAnimBase(AnimBase):
 
         # if not provided create an image to draw on
         if self.fgImage is None:
-            self.fgImage = Image.Image(image=NumpyImage.NumpyImage(width=Panel.width, height=Panel.height,alpha=0))
+            self.fgImage = Image.Image(image=NumpyImage.NumpyImage(width=self.panel.width, height=self.panel.height,alpha=0))
 
 
 
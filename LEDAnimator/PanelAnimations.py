@@ -60,7 +60,7 @@ class RandomRectangles(PanelAnimBase):
 
     def step(self,chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         # change color on every reset
@@ -73,10 +73,10 @@ class RandomRectangles(PanelAnimBase):
         if self.multiColored:
             self.color = self.getNextPaletteEntry().getPixelColor()
 
-        x=random.randint(0,Panel.width-2)   # rectangles min of 2x2
-        y=random.randint(0,Panel.height-2)
-        w=int((Panel.width-x)/2)
-        h=int((Panel.height-y)/2)
+        x=random.randint(0,self.panel.width-2)   # rectangles min of 2x2
+        y=random.randint(0,self.panel.height-2)
+        w=int((self.panel.width-x)/2)
+        h=int((self.panel.height-y)/2)
 
         if w>2:
             w=random.randint(2,w)
@@ -111,7 +111,7 @@ class RandomCircles(PanelAnimBase):
 
     def step(self,chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -152,7 +152,7 @@ class RandomEllipses(PanelAnimBase):
 
     def step(self, chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -184,7 +184,7 @@ class RandomSparkle(PanelAnimBase):
 
     def step(self,chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -220,7 +220,7 @@ class Line(PanelAnimBase):
 
     def step(self,chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -261,7 +261,7 @@ class PolyLines(PanelAnimBase):
 
     def step(self,chain=None):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -300,18 +300,18 @@ class Rainbow(PanelAnimBase):
 
         # speed control
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         assert self.palette is not None,"palette is required."
         assert type(self.bandWidth) is int,"bandWidth must be an int"
         assert self.bandWidth>0,"bandWidth must be greater than zero."
 
-        for X in range(0,Panel.width,self.bandWidth):
+        for X in range(0,self.panel.width,self.bandWidth):
             self.color=self.getNextPaletteEntry().getPixelColor()
             # draw a solid rectangle on the output image
             # this defaults to an anti-aliased line but they are vertical
-            self.fgImage.drawRectangle((X,0),(X+self.bandWidth,Panel.height),self.color,FILLED)
+            self.fgImage.drawRectangle((X,0),(X+self.bandWidth,self.panel.height),self.color,FILLED)
 
         # send it to the panel
         self.refreshCanvas()
@@ -343,14 +343,14 @@ class Twinkle(PanelAnimBase):
     def step(self,chain=None):
         # speed control
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
             self.fgImage.clear()
             if self.stars is None:
                 p=PoissonLib()
-                self.stars=p.getSamples(30,self.radius,Panel.width,Panel.height)
+                self.stars=p.getSamples(30,self.radius,self.panel.width,self.panel.height)
             self.init=False
 
         # main loop - iterate through the list of stars and
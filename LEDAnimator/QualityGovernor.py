@@ -0,0 +1,249 @@
+"""
+QualityGovernor.py
+
+Trades rendering quality for speed when the Animator cannot keep up with the frame rate.
+
+A QualityKnob is one setting which can be turned down to save CPU, for example the interpolation
+used when resizing images or anti-aliasing of text. Each knob has a list of levels, best quality first.
+
+Animations offer the knobs which affect them through getQualityKnobs(). The Animator registers them
+with its governor and calls update() once per frame with the time the frame took to render.
+
+If frames overrun for overrunFrames frames in a row the governor turns the knob with the lowest
+priority number down one level. After any change the governor waits settleFrames frames before
+judging again. When the smoothed loop time has been under raiseAt of the frame
+interval for headroomFrames frames the most recently lowered knob is turned back up.
+
+Every change is printed and kept in the changes list as (showTime,knob name,old value,new value,load).
+
+Knobs are often module level settings shared by every Animator, for instance one Animator per Zone.
+Each governor keeps its own level for every knob and the knob uses the lowest quality any governor
+has asked for, so one governor raising or restoring quality does not undo another's changes.
+Zone Animators run on their own threads so each knob has a lock around its levels.
+
+usage:-
+
+    knob=QualityKnob(name="text anti-aliasing",levels=[True,False],apply=setTextAA,priority=1)
+
+    governor=QualityGovernor(interval=1.0/fps)
+    governor.register(knob)
+    ...
+    governor.update(loopTime,showTime)
+
+"""
+
+import threading
+
+
+class QualityKnob(object):
+    """
+    Parameters:-
+
+    name        unique name, knobs with the same name are only registered once
+    levels      list of values, best quality first
+    apply       function called with the new value whenever the level changes
+    priority    knobs with lower numbers are turned down first
+    """
+
+    name=None
+    levels=None
+    apply=None
+    priority=1
+    level=0         # index into levels of the value in use
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.name is not None,"QualityKnob() name not set."
+        assert self.levels is not None and len(self.levels)>1,"QualityKnob() "+self.name+" needs at least two levels."
+        assert self.apply is not None,"QualityKnob() "+self.name+" apply function not set."
+
+        self.requests={}    # owner: level asked for, owners at level 0 are not kept
+        self.lock=threading.Lock()
+
+    def getLevel(self,owner=None):
+        """
+        :param owner: usually a QualityGovernor. None for the level in use
+        :return int: index into levels
+        """
+        with self.lock:
+            if owner is None: return self.level
+            return self.requests.get(owner,0)
+
+    def getValue(self,owner=None):
+        return self.levels[self.getLevel(owner)]
+
+    def canLower(self,owner=None):
+        return self.getLevel(owner)<len(self.levels)-1
+
+    def canRaise(self,owner=None):
+        return self.getLevel(owner)>0
+
+    def setLevel(self,level,owner=None):
+        """
+        records the level an owner wants. The knob uses the highest level (lowest quality) asked for
+        by any owner.
+
+        :param int level: index into levels
+        :param owner: usually a QualityGovernor
+        :return: Nothing, the apply function is called if the level in use changes
+        """
+        # held while applying so two governors cannot apply their values in the wrong order
+        with self.lock:
+            if level==0:
+                self.requests.pop(owner,None)
+            else:
+                self.requests[owner]=level
+
+            level=max(self.requests.values() or [0])
+            if level<>self.level:
+                self.level=level
+                self.apply(self.levels[level])
+
+
+class QualityGovernor(object):
+    """
+    Parameters:-
+
+    interval        seconds per frame (required)
+    lowerAt         quality is lowered when the loop time is over lowerAt*interval ...
+    overrunFrames   ... for this many frames in a row
+    raiseAt         quality is raised when the smoothed loop time is under raiseAt*interval ...
+    headroomFrames  ... for this many frames in a row
+    settleFrames    frames to wait after a change, so it can take effect, before judging again
+    smoothing       weight given to the latest frame in the smoothed loop time (0->1.0)
+    verbose         print each change
+    """
+
+    interval=None
+    lowerAt=1.0
+    overrunFrames=3
+    raiseAt=0.6
+    headroomFrames=100
+    settleFrames=10
+    smoothing=0.1
+    verbose=True
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert self.interval is not None,"QualityGovernor() interval not set."
+        assert self.raiseAt<self.lowerAt,"QualityGovernor() raiseAt must be less than lowerAt."
+
+        self.knobs=[]       # in the order registered
+        self.knobNames=set()
+        self.lowered=[]     # knobs which have been turned down, most recent last
+        self.changes=[]
+        self.load=None
+        self.overruns=0
+        self.headroom=0
+        self.settle=0
+
+    def register(self,knob):
+        """
+        adds a knob. Knobs already registered, by name, are ignored.
+
+        :param QualityKnob knob: the knob
+        :return: Nothing
+        """
+        if knob.name not in self.knobNames:
+            self.knobNames.add(knob.name)
+            self.knobs.append(knob)
+
+    def registerKnobs(self,knobs):
+        for knob in knobs:
+            self.register(knob)
+
+    def getValues(self):
+        """
+        used to pass the settings on to layers rendered in other processes
+
+        :return dict: knob name: value in use, for every registered knob
+        """
+        return dict((knob.name,knob.getValue()) for knob in self.knobs)
+
+    def update(self,loopTime,showTime=0):
+        """
+        called once per frame
+
+        :param float loopTime: seconds taken to render the frame
+        :param float showTime: used to log when changes happen
+        :return: Nothing
+        """
+        load=loopTime/self.interval
+
+        if self.load is None:
+            self.load=load
+        else:
+            self.load+=(load-self.load)*self.smoothing
+
+        if self.settle>0:
+            self.settle-=1
+            return
+
+        if load>self.lowerAt:
+            self.overruns+=1
+            self.headroom=0
+        elif self.load<self.raiseAt:
+            self.overruns=0
+            self.headroom+=1
+        else:
+            self.overruns=0
+            self.headroom=0
+
+        if self.overruns>=self.overrunFrames:
+            self.overruns=0
+            self.lowerQuality(showTime)
+        elif self.headroom>=self.headroomFrames:
+            self.headroom=0
+            self.raiseQuality(showTime)
+
+    def lowerQuality(self,showTime=0):
+        """
+        turns down the knob with the lowest priority number which can be turned down.
+        Knobs with the same priority are turned down in the order they were registered.
+
+        :param float showTime: used to log the change
+        :return bool: True if a knob was changed
+        """
+        candidates=[knob for knob in self.knobs if knob.canLower(self)]
+        if not candidates: return False
+
+        knob=min(candidates,key=lambda k: k.priority)
+        self._change(knob,knob.getLevel(self)+1,showTime)
+        self.lowered.append(knob)
+        return True
+
+    def raiseQuality(self,showTime=0):
+        """
+        turns the most recently lowered knob back up one level
+
+        :param float showTime: used to log the change
+        :return bool: True if a knob was changed
+        """
+        if not self.lowered: return False
+
+        knob=self.lowered.pop()
+        self._change(knob,knob.getLevel(self)-1,showTime)
+        return True
+
+    def restore(self):
+        """
+        withdraws every change this governor made. Knobs lowered by other governors stay lowered.
+
+        :return: Nothing
+        """
+        for knob in self.knobs:
+            if knob.getLevel(self)<>0: knob.setLevel(0,self)
+        self.lowered=[]
+
+    def _change(self,knob,level,showTime):
+        old=knob.getValue(self)
+        knob.setLevel(level,self)
+        self.settle=self.settleFrames
+        self.changes.append((showTime,knob.name,old,knob.getValue(self),self.load))
+        if self.verbose:
+            print "QualityGovernor %.3fs %s changed from %s to %s load=%.2f" % \
+                  (showTime,knob.name,str(old),str(knob.getValue(self)),self.load)
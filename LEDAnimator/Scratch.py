@@ -0,0 +1,106 @@
+"""
+Scratch.py
+
+Temporary arrays for the render pipeline.
+
+Blending, chain colour conversion and image adjustments need the same temporary arrays frame after
+frame. Instead of allocating them every time they are taken from this arena, keyed by the name of the
+temporary, its shape and its dtype, and used again on the next frame. Once the show has been round once
+rendering allocates nothing.
+
+The Animator calls reset() at the start of each frame. Arrays which have not been used for keepFrames
+frames (a text ROI which has scrolled to a new size, for instance) are dropped so the arena does not grow.
+Layers which only step every few frames (see AnimBase.redrawLayer()) keep theirs.
+
+Each thread has its own arena because layers may be stepped on a thread pool (see Animator layerMode).
+
+A scratch array is only valid until the next get() with the same name on the same thread, so it must
+not be kept or returned to callers which might keep it. Its contents are not cleared.
+
+usage:-
+
+    tmp=Scratch.get("alphaBlend.src_a",fg.shape[:-1],np.float32)
+
+"""
+
+import threading
+import numpy as np
+
+keepFrames=50               # frames an unused array is kept for
+
+_local=threading.local()
+_lock=threading.Lock()
+_generation=0               # frame count, incremented by reset()
+_allocated=0                # arrays created
+
+
+class Arena(object):
+    """
+    one thread's scratch arrays
+    """
+
+    def __init__(self):
+        self.arrays={}          # (name,shape,dtype): ndarray
+        self.lastUsed={}        # (name,shape,dtype): generation
+        self.generation=_generation
+
+    def prune(self):
+        """
+        drops the arrays which have not been used for keepFrames frames
+
+        :return: Nothing
+        """
+        for key,generation in self.lastUsed.items():
+            if _generation-generation>keepFrames:
+                del self.arrays[key]
+                del self.lastUsed[key]
+
+        self.generation=_generation
+
+
+def _arena():
+    arena=getattr(_local,"arena",None)
+    if arena is None:
+        arena=_local.arena=Arena()
+    return arena
+
+def get(name,shape,dtype=np.float32):
+    """
+    :param str name: what the array is used for, arrays needed at the same time must have different names
+    :param tuple shape: array shape
+    :param dtype: numpy dtype
+    :return numpy ndarray: an array which may hold anything
+    """
+    global _allocated
+
+    arena=_arena()
+
+    # pruning is done by the thread which owns the arena
+    if arena.generation<>_generation: arena.prune()
+
+    key=(name,tuple(shape),np.dtype(dtype))
+    arena.lastUsed[key]=_generation
+
+    array=arena.arrays.get(key)
+    if array is None:
+        array=arena.arrays[key]=np.empty(shape,dtype)
+        with _lock:
+            _allocated+=1
+
+    return array
+
+def reset():
+    """
+    starts a new frame, called by the Animator
+
+    :return: Nothing
+    """
+    global _generation
+    _generation+=1
+
+def getStats():
+    """
+    :return dict: allocated, arrays created since the program started
+    """
+    with _lock:
+        return {"allocated":_allocated}
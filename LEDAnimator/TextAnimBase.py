@@ -27,6 +27,7 @@ import Panel
 from LEDAnimator.AnimBase import AnimBase
 from LEDAnimator.NumpyImage import NumpyImage
 from LEDAnimator.BDF import Font as bdf
+import LEDAnimator.PILFONT.Font as PilFont
 from Constants import *
 import Font
 from Palette import *
@@ -154,6 +155,9 @@ class TextAnimBase(AnimBase):
         # fill the buffer
         self.textBuffer[:,:]=[color]
 
+    def getQualityKnobs(self):
+        return [PilFont.antiAliasKnob]
+
     def drawText(self): #,brightness=1.0,alpha=1.0):
         """
         renders current text onto the text buffer which can be later copied to the Panel
@@ -225,13 +229,10 @@ class TextAnimBase(AnimBase):
 
         # set alpha
         # textAlpha is in range 0->1.0
-        # multiply current settings
+        # it multiplies the textBuffer alphas when blended to retain relative transparency
         # no point bothering if alpha is zero
         if self.textAlpha>0:
-            # multiply all alphas by textAlpha to retain relative transparency
-            im=self.textBuffer.copy()
-            im[:, :, 3] = im[:, :, 3].astype(float) * self.textAlpha
-            Panel.DrawImage(x, y, im)
+            self.drawLayer(x, y, self.textBuffer, self.textAlpha)
 
 
 
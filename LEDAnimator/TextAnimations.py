@@ -26,7 +26,7 @@ class On(TextAnimBase):
 # FADE
 class Fade(TextAnimBase):
     """
-    fade text in or out
+    fade text in or out by changing the layer opacity
 
     If multiColored is True then each character uses the colors from the palette
 
@@ -40,16 +40,16 @@ class Fade(TextAnimBase):
         super(Fade,self).reset()
 
         # necessary to prevent invisible textBuffer showing up before step() is called
-        self.textAlpha = 0.0
+        self.opacity = 0.0
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
             self.FgColor=self.getFgColor()
-            self.textAlpha=0.0 if self.direction == 1 else 1.0
+            self.opacity=0.0 if self.direction == 1 else 1.0
             self.origin=(self.Xpos,self.Ypos)
             self.drawText()
             self.refreshCanvas()
@@ -58,19 +58,19 @@ class Fade(TextAnimBase):
         # work out visibility - time based. We want to fade in starting from the end of a startPause
         # upto the start of the endPause
         # So, goes from zero to hero in duration-startPause-endPause seconds
-        self.textAlpha = (time.time()-self.startTime)/(self.duration-self.startPause-self.endPause)
+        self.opacity = (self.now()-self.startTime)/(self.duration-self.startPause-self.endPause)
 
         # make the transparency decrease
         if self.direction==1:
-            if self.textAlpha > 1.0:
-                self.textAlpha=1.0   # can't increase beyond full on
+            if self.opacity > 1.0:
+                self.opacity=1.0   # can't increase beyond full on
                 self.animationHasFinished()
         # or make the transparency increase
         else:
-            self.textAlpha = 1.0 - self.textAlpha
-            if self.textAlpha < 0.0:
+            self.opacity = 1.0 - self.opacity
+            if self.opacity < 0.0:
                 self.animationHasFinished()
-                self.textAlpha=0.0  # can't decrease below full off
+                self.opacity=0.0  # can't decrease below full off
 
         self.origin=(self.Xpos,self.Ypos)
         self.refreshCanvas()
@@ -110,7 +110,7 @@ class Move(TextAnimBase):
 
     def step(self):
         if self.isNotNextStep():
-            self.refreshCanvas()
+            self.redrawLayer()
             return
 
         if self.init:
@@ -196,7 +196,7 @@ class MoveTimed(TextAnimBase):
     def step(self):
 
         if self.init:
-            self.startTime=time.time()
+            self.startTime=self.now()
             self.fgColor=self.getFgColor()
             self.origin = self.startPos
             self.multiColored=self.text.getMultiColored()
@@ -213,7 +213,7 @@ class MoveTimed(TextAnimBase):
         if self.endPaused(): return
 
         # how long since this animation started?
-        tElapsed=time.time()-self.startTime-self.startPause # begins after the startPause
+        tElapsed=self.now()-self.startTime-self.startPause # begins after the startPause
 
         # animation has finished
         if tElapsed >= self.duration:
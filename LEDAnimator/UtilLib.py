@@ -13,17 +13,68 @@ import time
 np.seterr(divide='ignore', invalid='ignore')
 
 import BDF
+import Scratch
 from Constants import *
+from ExceptionErrors import *
 import cv2
 import colorsys
+import platform
 
-def alphaBlend(fg, bg):
+def _makeMonotonic():
+    """
+    picks the best monotonic clock available on this platform.
+
+    time.time() can jump when the Pi's clock is set by NTP so it is no good for frame scheduling.
+    Python 2 has no time.monotonic() so on Linux we ask librt for CLOCK_MONOTONIC and on Windows
+    time.clock() (QueryPerformanceCounter) is used.
+
+    :return function: a function returning seconds as a float
+    """
+    if hasattr(time, "monotonic"):
+        return time.monotonic
+
+    if platform.system()=="Windows":
+        return time.clock
+
+    try:
+        import ctypes
+        import ctypes.util
+
+        CLOCK_MONOTONIC=1   # see <linux/time.h>
+
+        class timespec(ctypes.Structure):
+            _fields_=[("tv_sec",ctypes.c_long),("tv_nsec",ctypes.c_long)]
+
+        librt=ctypes.CDLL(ctypes.util.find_library("rt") or "librt.so.1", use_errno=True)
+        clock_gettime=librt.clock_gettime
+        clock_gettime.argtypes=[ctypes.c_int,ctypes.POINTER(timespec)]
+
+        def _monotonic():
+            ts=timespec()   # local so that threads don't share it
+            clock_gettime(CLOCK_MONOTONIC,ctypes.byref(ts))
+            return ts.tv_sec+ts.tv_nsec*1e-9
+
+        _monotonic()    # make sure it actually works
+        return _monotonic
+
+    except Exception:
+        print "UtilLib: no monotonic clock available, using time.time()"
+        return time.time
+
+# returns seconds from an arbitrary starting point, never goes backwards
+monotonic=_makeMonotonic()
+
+def alphaBlend(fg, bg, opacity=1.0, out=None):
     """
     Used internally by pasteWithAlphaAt() and alphaBlendPixel() but could be used externally
     blend two images based on the alpha channel. src (fg) and dst (bg) MUST be the same size.
 
+    The float temporaries come from Scratch.py so nothing is allocated once they exist.
+
     :param numpy ndarray fg: foreground numpy image
     :param numpy ndarray bg: background numpy image
+    :param float opacity: 0.0->1.0 multiplies the fg alpha, so fg can be faded without changing it
+    :param numpy ndarray out: where to put the result, may be bg. None for a new image
     :return: numpy ndarray blended images
     """
 
@@ -52,24 +103,167 @@ def alphaBlend(fg, bg):
             return None
 
 
-    src_rgb = fg[..., :3].astype(np.float32) / 255.0
-    src_a = fg[..., 3].astype(np.float32) / 255.0
-    dst_rgb = bg[..., :3].astype(np.float32) / 255.0
-    dst_a = bg[..., 3].astype(np.float32) / 255.0
-
-    out_a = src_a + dst_a * (1.0 - src_a)
-
+    planeShape = fg.shape[:-1]
+    rgbShape = planeShape+(3,)
+
+    src_rgb = Scratch.get("alphaBlend.src_rgb", rgbShape)
+    src_a = Scratch.get("alphaBlend.src_a", planeShape)
+    dst_rgb = Scratch.get("alphaBlend.dst_rgb", rgbShape)
+    dst_a = Scratch.get("alphaBlend.dst_a", planeShape)
+    inv_a = Scratch.get("alphaBlend.inv_a", planeShape)
+    out_a = Scratch.get("alphaBlend.out_a", planeShape)
+
+    # bg is read before out is written so out may be bg
+    np.copyto(src_rgb, fg[..., :3])
+    src_rgb /= 255.0
+    np.copyto(src_a, fg[..., 3])
+    src_a /= 255.0
+    if opacity<>1.0: src_a *= opacity
+    np.copyto(dst_rgb, bg[..., :3])
+    dst_rgb /= 255.0
+    np.copyto(dst_a, bg[..., 3])
+    dst_a /= 255.0
+
+    # out_a = src_a + dst_a * (1.0 - src_a)
+    np.subtract(1.0, src_a, out=inv_a)
+    np.multiply(dst_a, inv_a, out=out_a)
+    out_a += src_a
+
+    # out_rgb = (src_rgb * src_a + dst_rgb * dst_a * (1.0 - src_a)) / out_a
     # sometimes throws a "RuntimeWarning: invalid value encountered in divide"
     # but still carries on without throwing an exception
-    out_rgb = (src_rgb * src_a[..., None]
-               + dst_rgb * dst_a[..., None] * (1.0 - src_a[..., None])) / out_a[..., None]
+    src_rgb *= src_a[..., None]
+    dst_rgb *= dst_a[..., None]
+    dst_rgb *= inv_a[..., None]
+    src_rgb += dst_rgb
+    src_rgb /= out_a[..., None]
+
+    if out is None: out = np.zeros_like(bg)
 
-    out = np.zeros_like(bg)
-    out[..., :3] = out_rgb * 255
-    out[..., 3] = out_a * 255
+    src_rgb *= 255
+    out[..., :3] = src_rgb
+    out_a *= 255
+    out[..., 3] = out_a
 
     return out
 
+def div255(x):
+    """
+    divides by 255, rounding to the nearest integer, using adds and shifts. Exact for 0 to 255*255.
+
+    :param numpy ndarray x: uint16 values
+    :return numpy ndarray: uint16 x/255
+    """
+    x=x+128
+    return (x+(x>>8))>>8
+
+def premultiply(image, out=None):
+    """
+    multiplies the colour channels by alpha, as used by alphaBlendInt()
+
+    :param numpy ndarray image: uint8 RGBA image with ordinary colours
+    :param numpy ndarray out: where to put the result, None for a new image
+    :return numpy ndarray: uint8 RGBA image with premultiplied colours
+    """
+    if out is None: out=np.empty_like(image)
+
+    alpha=image[..., ALPHA]
+    out[..., :3]=div255(image[..., :3].astype(np.uint16)*alpha[..., None])
+    out[..., ALPHA]=alpha
+    return out
+
+def alphaBlendInt(fg, bg, opacity=1.0, premultiplied=False):
+    """
+    Integer version of alphaBlend(). Blends fg over bg writing the result into bg, nothing is allocated
+    for the output and there is no float conversion or division.
+
+    bg holds premultiplied colours (the colour channels are already multiplied by alpha). For an opaque
+    bg, like the Panel frameBuffer, that is the same as ordinary colours. A transparent bg, like a layer
+    buffer, ends up premultiplied and must be drawn with premultiplied=True.
+
+    :param numpy ndarray fg: uint8 foreground image, the same shape as bg
+    :param numpy ndarray bg: uint8 background image, changed in place
+    :param float opacity: 0.0->1.0 multiplies the fg alpha
+    :param bool premultiplied: True if fg holds premultiplied colours
+    :return numpy ndarray: bg
+    """
+    alpha=fg[..., ALPHA].astype(np.uint16)
+    rgb=fg[..., :3].astype(np.uint16)
+
+    if opacity<>1.0:
+        o=int(round(opacity*255))
+        alpha=div255(alpha*o)
+        if premultiplied: rgb=div255(rgb*o)
+
+    if not premultiplied:
+        rgb=div255(rgb*alpha[..., None])
+
+    # out = src + dst * (1-src alpha)
+    inverse=255-alpha
+    bg[..., :3]=rgb+div255(bg[..., :3]*inverse[..., None])
+    bg[..., ALPHA]=alpha+div255(bg[..., ALPHA]*inverse)
+    return bg
+
+def blendModeInt(fg, bg, blendMode, opacity=1.0, premultiplied=False):
+    """
+    Blends fg onto bg with one of the BLEND_MODES other than "over" (see alphaBlendInt()), writing the
+    result into bg. The fg colours are multiplied by its alpha first so transparent pixels change nothing.
+
+    "add"       bg + fg, limited to 255. Glows and light trails
+    "multiply"  bg * fg / 255. Darkens, shadows and tints
+    "screen"    255 - (255-bg) * (255-fg) / 255. Lightens without saturating as quickly as add
+    "max"       the larger of bg and fg for each channel. Sparkles
+
+    :param numpy ndarray fg: uint8 foreground image, the same shape as bg
+    :param numpy ndarray bg: uint8 background image, changed in place
+    :param str blendMode: "add", "multiply", "screen" or "max"
+    :param float opacity: 0.0->1.0 multiplies the fg alpha
+    :param bool premultiplied: True if fg holds premultiplied colours
+    :return numpy ndarray: bg
+    """
+    planeShape=fg.shape[:-1]
+    alpha=Scratch.get("blendModeInt.alpha",planeShape,np.uint16)
+    src=Scratch.get("blendModeInt.src",planeShape+(3,),np.uint16)
+    dst=Scratch.get("blendModeInt.dst",planeShape+(3,),np.uint16)
+
+    np.copyto(alpha,fg[..., ALPHA])
+    np.copyto(src,fg[..., :3])
+    np.copyto(dst,bg[..., :3])
+
+    if opacity<>1.0:
+        o=int(round(opacity*255))
+        alpha[...]=div255(alpha*o)
+        if premultiplied: src[...]=div255(src*o)
+
+    if not premultiplied:
+        src[...]=div255(src*alpha[..., None])
+
+    if blendMode=="add":
+        dst+=src
+        np.minimum(dst,255,out=dst)
+    elif blendMode=="multiply":
+        # where fg is transparent bg is multiplied by 255, src<=alpha so this fits in 16 bits
+        src+=(255-alpha)[..., None]
+        dst*=src
+        dst[...]=div255(dst)
+    elif blendMode=="screen":
+        tmp=div255(dst*src)
+        dst+=src
+        dst-=tmp
+    elif blendMode=="max":
+        np.maximum(dst,src,out=dst)
+    else:
+        raise InvalidMode("UtilLib.blendModeInt() blendMode should be one of "+str(BLEND_MODES[1:])+
+                          " got "+str(blendMode))
+
+    bg[..., :3]=dst
+
+    # multiply only darkens so it leaves the bg alpha alone
+    if blendMode<>"multiply":
+        bgAlpha=bg[..., ALPHA].astype(np.uint16)
+        bg[..., ALPHA]=bgAlpha+div255(alpha*(255-bgAlpha))
+    return bg
+
 def alphaBlendPixels(fg, bg):
     """
     Used internally by pasteWithAlphaAt() and alphaBlendPixel() but could be used externally
@@ -112,7 +306,24 @@ def alphaBlendPixel(fg, bg):
     else:
         return alphaBlend(fg,bg)
 
-def pasteWithAlphaAt(bg, bx, by, fg):
+def classifyAlpha(image):
+    """
+    works out which blend pasteWithAlphaAt() needs for an image
+
+    :param numpy ndarray image: RGBA image
+    :return int: ALPHA_OPAQUE, ALPHA_TRANSPARENT, ALPHA_MASK or ALPHA_GENERAL (see Constants.py)
+    """
+    alpha=image[..., ALPHA]
+    if alpha.size==0: return ALPHA_TRANSPARENT
+
+    lo,hi=alpha.min(),alpha.max()
+    if lo==255: return ALPHA_OPAQUE
+    if hi==0: return ALPHA_TRANSPARENT
+    if lo==0 and hi==255 and not np.any((alpha>0) & (alpha<255)): return ALPHA_MASK
+    return ALPHA_GENERAL
+
+def pasteWithAlphaAt(bg, bx, by, fg, opacity=1.0, premultiplied=False, integer=False, alphaClass=None,
+                     blendMode="over"):
     """
     Pastes fg into bg using alpha channel.
 
@@ -121,10 +332,20 @@ def pasteWithAlphaAt(bg, bx, by, fg):
     If fg is pasted into bg, returns the next Z position - useful
     for butting images together like when drawing text glyphs
 
+    Opaque images are copied, transparent ones are skipped and masks (alpha 0 or 255) are copied
+    where the alpha is 255. Only other images are blended.
+
+    blendMode "over" is the usual alpha blend, the others are done by blendModeInt().
+
     :param numpy ndarray bg: background image
     :param float bx: coordinate of top left corner for fg on bg
     :param float by: coordinate of top left corner for fg on bg
     :param numpy ndarray fg: image to paste into bg
+    :param float opacity: 0.0->1.0 multiplies the fg alpha, see alphaBlend()
+    :param bool premultiplied: True if fg holds premultiplied colours, see alphaBlendInt()
+    :param bool integer: True to blend with alphaBlendInt() instead of alphaBlend()
+    :param int alphaClass: from classifyAlpha() if known (see NumpyImage.getAlphaClass()), None to work it out
+    :param str blendMode: one of BLEND_MODES (see Constants.py)
     :return int : next x position (used for character strings)
     """
 
@@ -145,15 +366,40 @@ def pasteWithAlphaAt(bg, bx, by, fg):
         #print "UtilLib.pasteWithAlpha() ROI is None,bx,by=",bx,by,"fg shape=",fg.shape
         return bx
 
-    blend=alphaBlend(fgROI,bgROI)
+    # fully transparent, nothing to blend
+    if opacity<=0: return bx+w
+
+    # the class of the whole image holds for any part of it except ALPHA_GENERAL
+    if alphaClass is None: alphaClass=classifyAlpha(fgROI)
+
+    if alphaClass==ALPHA_TRANSPARENT: return bx+w
+
+    if blendMode<>"over":
+        blendModeInt(fgROI,bgROI,blendMode,opacity,premultiplied)
+        return bx+w
+
+    # premultiplied colours are the same as ordinary colours where alpha is 255
+    if opacity==1.0:
+        if alphaClass==ALPHA_OPAQUE:
+            bgROI[...]=fgROI
+            return bx+w
+
+        if alphaClass==ALPHA_MASK:
+            np.copyto(bgROI,fgROI,where=fgROI[..., ALPHA:ALPHA+1]==255)
+            return bx+w
+
+    # premultiplied images can only be blended by the integer kernel
+    if integer or premultiplied:
+        alphaBlendInt(fgROI,bgROI,opacity,premultiplied)
+        return bx+w
+
+    # blend straight into the background
+    blend=alphaBlend(fgROI,bgROI,opacity,bgROI)
 
     if blend is None:
         #print "UtilLib.pasteWithAlpha() Blend is None"
         return bx
 
-    # copy blend output to background
-    bgROI[:,:,:]=blend[:,:,:]
-
     #cv2.imshow("blend",blend)
 
     h,w=fg.shape[:2]
@@ -161,6 +407,78 @@ def pasteWithAlphaAt(bg, bx, by, fg):
     # value used fior font rendering, ignored at other times
     return bx+w
 
+def blitMany(bg, blits, opacity=1.0, premultiplied=False, integer=False, blendMode="over"):
+    """
+    Pastes many small images, like text glyphs or sprites, into bg in one go. Calling pasteWithAlphaAt()
+    for each costs more in Python overheads than in blending when the images are tiny.
+
+    Every image is clipped to bg at once. If none of them overlap they are copied into a Scratch array
+    covering them all (see Scratch.py) which is then pasted with one pasteWithAlphaAt(). Overlapping images
+    are pasted one at a time, in order, so they blend with each other.
+
+    :param numpy ndarray bg: background image
+    :param list blits: (image,x,y) tuples, x,y are the top left corner of the RGBA image on bg
+    :param float opacity: see pasteWithAlphaAt()
+    :param bool premultiplied: see pasteWithAlphaAt()
+    :param bool integer: see pasteWithAlphaAt()
+    :param str blendMode: see pasteWithAlphaAt()
+    :return tuple: (x0,y0,x1,y1) the area of bg pasted on, None if no image was on bg
+    """
+    if len(blits)==0: return None
+
+    bh,bw=bg.shape[:2]
+
+    pos=np.array([(nearest(x),nearest(y)) for image,x,y in blits],np.int64)
+    size=np.array([image.shape[1::-1] for image,x,y in blits],np.int64)
+
+    # clip them all
+    x0=np.maximum(pos[:,0],0)
+    y0=np.maximum(pos[:,1],0)
+    x1=np.minimum(pos[:,0]+size[:,0],bw)
+    y1=np.minimum(pos[:,1]+size[:,1],bh)
+
+    visible=np.flatnonzero((x1>x0) & (y1>y0))
+    if len(visible)==0: return None
+
+    x0,y0,x1,y1=x0[visible],y0[visible],x1[visible],y1[visible]
+    area=(int(x0.min()),int(y0.min()),int(x1.max()),int(y1.max()))
+
+    overlaps=(x0[:,None]<x1[None,:]) & (x1[:,None]>x0[None,:]) & (y0[:,None]<y1[None,:]) & (y1[:,None]>y0[None,:])
+    np.fill_diagonal(overlaps,False)
+
+    if overlaps.any():
+        for n in visible.tolist():
+            image,x,y=blits[n]
+            pasteWithAlphaAt(bg,x,y,image,opacity,premultiplied,integer,blendMode=blendMode)
+        return area
+
+    ax0,ay0,ax1,ay1=area
+    stage=Scratch.get("blitMany.stage",(ay1-ay0,ax1-ax0,4),np.uint8)
+    stage.fill(0)
+
+    for n,sx0,sy0,sx1,sy1 in zip(visible.tolist(),x0.tolist(),y0.tolist(),x1.tolist(),y1.tolist()):
+        image=blits[n][0]
+        px,py=pos[n].tolist()
+        stage[sy0-ay0:sy1-ay0,sx0-ax0:sx1-ax0]=image[sy0-py:sy1-py,sx0-px:sx1-px]
+
+    pasteWithAlphaAt(bg,ax0,ay0,stage,opacity,premultiplied,integer,blendMode=blendMode)
+    return area
+
+def blitAtlas(bg, atlas, rects, positions, opacity=1.0, premultiplied=False, integer=False, blendMode="over"):
+    """
+    blitMany() for images held in one atlas image, like a sprite sheet
+
+    :param numpy ndarray bg: background image
+    :param numpy ndarray atlas: RGBA image holding all the images
+    :param list rects: (x,y,w,h) of each image in the atlas
+    :param list positions: (x,y) on bg for each image
+    :return tuple: see blitMany()
+    """
+    assert len(rects)==len(positions),"blitAtlas() rects and positions should be the same length"
+
+    blits=[(atlas[sy:sy+h,sx:sx+w],x,y) for (sx,sy,w,h),(x,y) in zip(rects,positions)]
+    return blitMany(bg,blits,opacity,premultiplied,integer,blendMode)
+
 
 def getActualBrightness(wanted):
     """
@@ -0,0 +1,220 @@
+"""
+Zone.py
+
+Splits the Panel into named rectangles, each driven by its own Animator.
+
+A Zone looks like the Panel to an Animator and its animations. It has its own frameBuffer, the size
+of the zone, which the layers are blended into so only the zone's pixels are touched. Animations
+scale and align their images to the zone and their layer buffers are the size of the zone.
+
+When a zone's Animator calls UpdateDisplay() the zone is copied into its place on the wall, a copy of
+the whole Panel, which is then sent to the Panel. Each zone can run at its own fps on its own thread
+(Animator.start()) so a busy zone does not hold up a quiet one.
+
+The wall is only locked while a zone is copied into it. With pipelined output the Panel frameBuffer is
+then handed to the output thread. Without it, the zone which finds the display free takes a copy of the
+Panel and sends it, outside the lock. Zones which change the Panel meanwhile do not wait, the zone which
+is sending picks up their changes and sends again until there are none left. If the display cannot keep
+up with every zone together, use the pipeline so frames are dropped instead.
+
+Zones may not overlap. Use Panel.StartPipeline() once for the whole Panel rather than setting
+pipelined=True on each Animator, and Panel.StopPipeline() when every zone has finished.
+
+usage:-
+
+    Panel.init(...)
+    slides=Zone.addZone(name="slides",x=0,y=0,width=64,height=64)
+    ticker=Zone.addZone(name="ticker",x=64,y=0,width=64,height=64)
+
+    A=Animator(fps=10,panel=slides)
+    B=Animator(fps=50,panel=ticker)
+    ...
+    A.start()
+    B.start()
+
+"""
+
+import threading
+import numpy as np
+import Panel
+import NumpyImage as ni
+from UtilLib import pasteWithAlphaAt
+from DirtyRects import BufferHistory
+
+zones={}                # by name
+_wall=None              # every zone's last frame in place
+_wallHistory=BufferHistory()    # what each Panel frameBuffer needs copying from the wall
+_wallLock=threading.Lock()
+
+# without the pipeline, guarded by _wallLock
+_shipping=False         # a zone is sending the Panel to the display
+_pendingRects=[]        # Panel rectangles changed since the last copy was sent, None for all of it
+
+
+class Zone(object):
+    """
+    Parameters:-
+
+    name            unique name (required)
+    x,y             top left corner on the Panel
+    width,height    size in pixels (required)
+    bgColor         background colour for Clear(), None uses the Panel background colour
+    """
+
+    name=None
+    x=0
+    y=0
+    width=None
+    height=None
+    bgColor=None
+
+    def __init__(self,**kwargs):
+        for key,value in kwargs.iteritems():
+            setattr(self,key,value)
+
+        assert Panel.frameBuffer is not None,"Zone() Panel.init() must be called first."
+        assert self.name is not None,"Zone() name not set."
+        assert self.width is not None and self.height is not None,"Zone() "+self.name+" width and height must be set."
+        assert self.x>=0 and self.y>=0 and self.x+self.width<=Panel.width and self.y+self.height<=Panel.height, \
+            "Zone() "+self.name+" does not fit on the Panel."
+
+        self.frameBuffer=ni.NumpyImage(width=self.width,height=self.height)
+
+    @property
+    def panelBgColor(self):
+        return self.bgColor if self.bgColor is not None else Panel.panelBgColor
+
+    def overlaps(self,other):
+        """
+        :param Zone other: another zone
+        :return bool: True if the two zones share any pixels
+        """
+        return self.x<other.x+other.width and other.x<self.x+self.width and \
+               self.y<other.y+other.height and other.y<self.y+self.height
+
+    def isRunning(self):
+        return Panel.isRunning()
+
+    def DrawImage(self,x,y,image,opacity=1.0,premultiplied=False,blendMode="over"):
+        """
+        see Panel.DrawImage(), x and y are relative to the zone
+        """
+        pasteWithAlphaAt(self.frameBuffer.out,x,y,image,opacity,premultiplied,Panel.integerBlend,blendMode=blendMode)
+
+    def DrawPixel(self,x,y,color):
+        self.frameBuffer.setPixel(x,y,color)
+
+    def GetPixel(self,x,y):
+        (a,b,c,d)=self.frameBuffer.getPixel(x,y)
+        return (a,b,c,d)
+
+    def Clear(self,rect=None):
+        if rect is None:
+            self.frameBuffer.fill(self.panelBgColor)
+            return
+
+        x0,y0,x1,y1=rect
+        self.frameBuffer.out[y0:y1,x0:x1]=[self.panelBgColor]
+
+    def Fill(self,color):
+        self.frameBuffer.fill(color)
+
+    def UpdateDisplay(self,rects=None):
+        """
+        puts the zone in its place on the Panel and sends the Panel to the display
+
+        :param list rects: (x0,y0,x1,y1) rectangles of the zone which have changed, None for all of it
+        :return: Nothing
+        """
+        global _wall,_shipping,_pendingRects
+
+        if rects is None: rects=[(0,0,self.width,self.height)]
+
+        # on the Panel
+        rects=[(self.x+x0,self.y+y0,self.x+x1,self.y+y1) for x0,y0,x1,y1 in rects]
+
+        with _wallLock:
+            if _wall is None or _wall.shape<>Panel.frameBuffer.out.shape:
+                _wall=np.zeros_like(Panel.frameBuffer.out)
+
+            for x0,y0,x1,y1 in rects:
+                _wall[y0:y1,x0:x1]=self.frameBuffer.out[y0-self.y:y1-self.y,x0-self.x:x1-self.x]
+
+            # Panel.UpdateDisplay() may hand back a frameBuffer holding an older frame (see Panel pipelined output)
+            copyRects=_wallHistory.findRedraw(Panel.frameBuffer,rects)
+            if copyRects is None:
+                Panel.frameBuffer.out[:]=_wall
+            else:
+                for x0,y0,x1,y1 in copyRects:
+                    Panel.frameBuffer.out[y0:y1,x0:x1]=_wall[y0:y1,x0:x1]
+
+            if Panel.pipelined:
+                # a quick hand over to the output thread
+                Panel.UpdateDisplay(rects)
+                return
+
+            if rects is None or _pendingRects is None:
+                _pendingRects=None
+            else:
+                _pendingRects.extend(rects)
+
+            # the zone which is sending will send this change too
+            if _shipping: return
+            _shipping=True
+
+        _shipWall()
+
+
+def _shipWall():
+    """
+    sends the Panel to the display until no zone has changed it since the last copy was sent.
+    Called without the wall lock by the zone which set _shipping.
+
+    :return: Nothing
+    """
+    global _shipping,_pendingRects
+
+    while True:
+        with _wallLock:
+            if _pendingRects==[]:
+                _shipping=False
+                return
+
+            # other zones may draw on the Panel whilst this copy is being sent
+            frame=Panel.frameBuffer.getImageData().copy()
+            rects=_pendingRects
+            _pendingRects=[]
+
+        Panel._shipFrame(frame,rects)
+
+def addZone(**kwargs):
+    """
+    creates a Zone, see Zone parameters
+
+    :return Zone: the new zone
+    """
+    zone=Zone(**kwargs)
+
+    assert zone.name not in zones,"addZone() there is already a zone called "+zone.name
+    for other in zones.itervalues():
+        assert not zone.overlaps(other),"addZone() "+zone.name+" overlaps "+other.name
+
+    zones[zone.name]=zone
+    return zone
+
+def getZone(name):
+    """
+    :param str name: zone name
+    :return Zone: the zone
+    """
+    assert name in zones,"getZone() no zone called "+str(name)
+    return zones[name]
+
+def removeZone(name):
+    """
+    forgets a zone, its pixels stay on the wall until drawn over
+
+    :param str name: zone name
+    :return: Nothing
+    """
+    zones.pop(name,None)
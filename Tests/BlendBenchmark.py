@@ -0,0 +1,80 @@
+"""
+BlendBenchmark.py
+
+Times the floating point alpha blend (UtilLib.alphaBlend()) against the integer premultiplied
+kernel (UtilLib.alphaBlendInt()) for a layer blended onto the Panel, and shows the largest
+difference between the two results. Run it on the Pi to decide whether to set Panel.integerBlend.
+
+Does not need a Panel or the simulator.
+
+usage:-
+
+    python BlendBenchmark.py
+
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.abspath(os.path.join(os.path.dirname(__file__),os.pardir)))
+
+import numpy as np
+from LEDAnimator.UtilLib import alphaBlend,alphaBlendInt,premultiply
+
+LOOPS=200
+SIZES=((64,64),(256,64))
+
+
+def makeLayer(width,height,kind):
+    """
+    :param int width: layer width
+    :param int height: layer height
+    :param str kind: "opaque", "transparent" or "text"
+    :return numpy ndarray: RGBA layer
+    """
+    layer=np.random.randint(0,256,(height,width,4)).astype(np.uint8)
+
+    if kind=="opaque":
+        layer[...,3]=255
+    elif kind=="text":
+        # mostly transparent with anti-aliased edges, like a text layer
+        alpha=np.zeros((height,width),np.uint8)
+        alpha[height/4:height/2,:]=np.random.choice([0,64,128,192,255],(height/2-height/4,width))
+        layer[...,3]=alpha
+
+    return layer
+
+def timeIt(func):
+    """
+    :param func: called LOOPS times
+    :return float: milliseconds per call
+    """
+    start=time.time()
+    for n in xrange(LOOPS):
+        func()
+    return (time.time()-start)*1000.0/LOOPS
+
+
+np.random.seed(1)
+
+print "%-10s %-12s %10s %10s %10s %8s" % ("size","layer","float ms","int ms","pm int ms","maxdiff")
+
+for width,height in SIZES:
+    panel=np.random.randint(0,256,(height,width,4)).astype(np.uint8)
+    panel[...,3]=255
+
+    for kind in ("opaque","transparent","text"):
+        layer=makeLayer(width,height,kind)
+        layerPm=premultiply(layer)
+        out=panel.copy()
+
+        floatMs=timeIt(lambda: alphaBlend(layer,panel))
+        intMs=timeIt(lambda: alphaBlendInt(layer,out))
+        pmMs=timeIt(lambda: alphaBlendInt(layerPm,out,premultiplied=True))
+
+        expected=alphaBlend(layer,panel)
+        result=alphaBlendInt(layer,panel.copy())
+        maxDiff=np.max(np.abs(expected.astype(int)-result.astype(int)))
+
+        print "%-10s %-12s %10.3f %10.3f %10.3f %8d" % ("%dx%d" % (width,height),kind,floatMs,intMs,pmMs,maxDiff)